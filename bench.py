@@ -0,0 +1,548 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import threading
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bs4 import BeautifulSoup
+from docx import Document
+
+import main
+
+# Benchmark for the comparison pipeline. Generates synthetic DOCX drafts and
+# matching live pages at several sizes, serves the pages from a local HTTP
+# server, and times each stage separately:
+#
+#   python bench.py --scales 25,100,300 --docs 5 --output bench_results.json
+#
+# --js-faq builds the FAQ sections with a script, as many live sites do;
+# add --render to time rendering them (needs Playwright and Chromium).
+#
+# --extract instead times extract_page_content against the original
+# implementation (kept below) on the generated pages; its output is checked
+# against fixtures in tests/test_extract.py.
+#
+# --normalize MB instead times normalize_text/normalize_html against the
+# original implementations (kept below) on MB-sized inputs. tests/test_normalize.py
+# imports the originals and make_markup from here to check their output.
+
+WORDS = (
+    "our team service clients project support quality price offer local business "
+    "experience free quote call today help home repair install design custom fast "
+    "reliable trusted professional years area city best value guarantee schedule"
+).split()
+
+STAGES = ["docx_parse", "fetch", "render", "extract", "normalize", "compare", "report"]
+
+# ------------------ Synthetic Corpus ------------------
+
+def make_sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def make_paragraph(rng, words):
+    sentences = max(1, words // 12)
+    return " ".join(make_sentence(rng, max(3, words // sentences)) for _ in range(sentences))
+
+def diverge(rng, text):
+    # Change a few words so the live block still partially matches the draft
+    words = text.split()
+    for _ in range(max(1, len(words) // 10)):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return " ".join(words)
+
+def make_corpus_item(rng, blocks, faq_sections, paragraph_words, divergence, js_faq=False):
+    # Returns (draft blocks, live html) where draft blocks are (style, text).
+    # With js_faq the FAQ markup is only inserted by a script once the page loads.
+    draft = [("Heading 1", make_sentence(rng, 6)[:-1])]
+    for i in range(blocks - 1):
+        if i % 8 == 0:
+            draft.append(("Heading 2", make_sentence(rng, 5)[:-1]))
+        else:
+            draft.append(("Normal", make_paragraph(rng, paragraph_words)))
+    faqs = []
+    for _ in range(faq_sections):
+        faqs.append([(make_sentence(rng, 8)[:-1] + "?", make_paragraph(rng, paragraph_words)) for _ in range(4)])
+        draft.append(("Heading 2", "Frequently Asked Questions"))
+        for question, answer in faqs[-1]:
+            draft.append(("Normal", f"Q: {question}"))
+            draft.append(("Normal", f"A: {answer}"))
+
+    live = []
+    for style, text in draft[:blocks]:
+        roll = rng.random()
+        if roll < divergence / 3:
+            continue  # dropped from the live page
+        if roll < 2 * divergence / 3:
+            text = diverge(rng, text)
+        elif roll < divergence:
+            live.append(f"<p>{make_paragraph(rng, paragraph_words)}</p>")  # live-only block
+        if style.startswith("Heading"):
+            level = style[-1]
+            live.append(f"<h{level}>{text}</h{level}>")
+        else:
+            live.append(f"<p>{text}</p>")
+    for pairs in faqs:
+        items = "".join(
+            "<div class='uagb-faq-item'><div class='uagb-faq-questions-button'>"
+            f"<span class='uagb-question'>{question}</span></div>"
+            f"<div class='uagb-faq-content'><p>{answer}</p></div></div>"
+            for question, answer in pairs
+        )
+        if js_faq:
+            script = "document.currentScript.previousElementSibling.innerHTML = %s;" % json.dumps(items).replace("</", "<\\/")
+            live.append(f"<div class='wp-block-uagb-faq'></div><script>{script}</script>")
+        else:
+            live.append(f"<div class='wp-block-uagb-faq'>{items}</div>")
+    html = (
+        "<html><head><title>Benchmark Page</title><meta name='description' content='Synthetic page'></head>"
+        f"<body><header><p>Menu</p></header><main>{''.join(live)}</main><footer><p>Footer</p></footer></body></html>"
+    )
+    return draft, html
+
+def write_docx(path, draft):
+    doc = Document()
+    for style, text in draft:
+        if style.startswith("Heading"):
+            doc.add_heading(text, int(style[-1]))
+        else:
+            doc.add_paragraph(text)
+    doc.save(path)
+
+# ------------------ Normalization ------------------
+
+def reference_normalize_text(text):
+    # normalize_text as it was before the compiled rewrite
+    text = re.sub(r"\r", "", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    return text.strip()
+
+def reference_normalize_html(text):
+    # normalize_html as it was before the single-pass rewrite
+    soup = BeautifulSoup(text, 'html.parser')
+    for a in soup.find_all('a'):
+        a.unwrap()
+    text = str(soup)
+    text = re.sub(r"<ul.*?>", "", text)
+    text = re.sub(r"</ul.*?>", "", text)
+    text = re.sub(r"<li.*?>", "• ", text)
+    text = re.sub(r"</li.*?>", "", text)
+    text = re.sub(r"</?(strong|b)>", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"([a-zA-Z])\s*:\s+", r"\1: ", text)
+    return text.strip()
+
+MARKUP_SNIPPETS = [
+    "<p>{}</p>", "<a href='/x'>{}</a>", "<strong>{}</strong> :  ", "<ul><li class='item'>{}</li></ul>",
+    "<LI>{}</LI>", "<link rel='x'>{}", "{} &amp; &nbsp;&#150;&copy &foo; ", "<!-- {} --> ", "{} < 3 > 2 ",
+    "<script>if (a<b && c>d) {{}}</script>{}", "<img alt='a > b'>{}", "<br/>{}\r\n\n\n\t ",
+    "<p>\t</p>{}", "<div>{}</div>\n\n  ", "<pre> {} \n\n </pre>", "<!DOCTYPE html>\n{}", "{} AT&T ",
+    "</ {} >", "</>{}",
+]
+
+def make_markup(rng, size):
+    parts = []
+    total = 0
+    while total < size:
+        part = rng.choice(MARKUP_SNIPPETS).format(make_sentence(rng, rng.randint(3, 12)))
+        parts.append(part)
+        total += len(part)
+    return "".join(parts)
+
+def run_normalize(rng, megabytes, blocks=2000):
+    # Timing: the page-sized markup is normalized whole, and
+    # the same text split into blocks through the batch API
+    markup = make_markup(rng, int(megabytes * 1_000_000))
+    text = markup.replace("<", "\n\n\n  \t")
+    step = max(1, len(text) // blocks)
+    pieces = [text[i:i + step] for i in range(0, len(text), step)]
+    cases = [
+        ("normalize_html", reference_normalize_html, main.normalize_html, markup),
+        ("normalize_text", reference_normalize_text, main.normalize_text, text),
+        ("normalize_blocks", lambda ps: [reference_normalize_text(p) for p in ps], main.normalize_blocks, pieces),
+    ]
+    results = []
+    for name, reference, current, data in cases:
+        start = time.perf_counter()
+        reference(data)
+        reference_s = time.perf_counter() - start
+        start = time.perf_counter()
+        current(data)
+        current_s = time.perf_counter() - start
+        results.append({
+            "function": name,
+            "megabytes": round(len(markup) / 1_000_000, 2),
+            "reference_s": round(reference_s, 6),
+            "current_s": round(current_s, 6),
+        })
+    return results
+
+# ------------------ Extraction ------------------
+
+def reference_extract_page_content(html):
+    # extract_page_content as it was before the single-walk rewrite
+    try:
+        soup = BeautifulSoup(html, "html.parser")
+
+        # Get title
+        title = "Untitled Page"
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+
+        # Get meta description
+        meta_description = ""
+        meta_desc_tag = soup.find("meta", attrs={"name": "description"})
+        if meta_desc_tag and meta_desc_tag.get("content"):
+            meta_description = meta_desc_tag["content"].strip()
+
+        # Try different content containers
+        content_containers = [
+            soup.find("main"),
+            soup.find("article"),
+            soup.find("div", {"class": ["content", "main-content", "page-content"]}),
+            soup.find("body")
+        ]
+
+        main = next((container for container in content_containers if container is not None), None)
+        if not main:
+            return "[ERROR: Could not find main content area]", title, meta_description
+
+        # Extract clean paragraphs while preserving structure
+        paragraphs = []
+
+        # First, handle regular content
+        for tag in main.find_all(["p", "li", "h1", "h2", "h3", "h4", "h5", "h6"]):
+            # Skip empty tags
+            if not tag.get_text(strip=True):
+                continue
+
+            # Skip if inside structured content section to avoid duplication
+            if tag.find_parent(class_=lambda x: x and any(keyword in str(x).lower() for keyword in [
+                'faq', 'accordion', 'expandable', 'collapse', 'toggle',
+                'uagb-faq', 'uagb-container', 'wp-block-uagb'
+            ])):
+                continue
+
+            # Create a copy to work with
+            tag_copy = BeautifulSoup(str(tag), "html.parser")
+
+            # Handle links by preserving their text
+            for a in tag_copy.find_all('a'):
+                if a.get_text(strip=True):
+                    a.unwrap()
+
+            # Get the complete text of the element
+            text = tag_copy.get_text(" ", strip=True)
+            if text and len(text) > 1:
+                # Preserve heading tags
+                if tag.name.startswith('h'):
+                    paragraphs.append(f"<{tag.name}>{text}</{tag.name}>")
+                else:
+                    paragraphs.append(text)
+
+        # Then, handle structured content sections
+        structured_content_patterns = [
+            # UAGB FAQ patterns
+            {'class_': lambda x: x and any(c for c in str(x).split() if c.startswith('uagb-faq'))},
+            {'class_': lambda x: x and any(c for c in str(x).split() if c.startswith('wp-block-uagb-faq'))},
+            # Generic FAQ patterns
+            {'class_': lambda x: x and any(keyword in str(x).lower() for keyword in ['faq', 'frequently-asked'])},
+            # Accordion patterns
+            {'class_': lambda x: x and any(keyword in str(x).lower() for keyword in ['accordion', 'expandable', 'collapse'])},
+            # ARIA patterns
+            {'role': 'tablist'},
+            {'role': 'tab'},
+            # Container patterns
+            {'class_': lambda x: x and 'uagb-container-inner-blocks-wrap' in str(x)}
+        ]
+
+        # Find all structured content sections
+        structured_sections = []
+        for pattern in structured_content_patterns:
+            sections = main.find_all(**pattern)
+            structured_sections.extend(sections)
+
+        # Remove duplicates while preserving order
+        seen = set()
+        structured_sections = [x for x in structured_sections if not (str(x) in seen or seen.add(str(x)))]
+
+        # Process each structured section
+        for section in structured_sections:
+            # Try to find a section heading first
+            section_heading = section.find(class_=lambda x: x and 'uagb-heading-text' in str(x))
+            if section_heading and section_heading.get_text(strip=True):
+                paragraphs.append(f"<h2>{section_heading.get_text(strip=True)}</h2>")
+
+            # Find all question/answer pairs using multiple approaches
+            qa_pairs = []
+
+            # Method 1: UAGB FAQ structure
+            questions = section.find_all(class_='uagb-question')
+            for question in questions:
+                # Get the FAQ item container
+                faq_item = question.find_parent(class_=lambda x: x and 'uagb-faq-item' in str(x))
+                if faq_item:
+                    # Find the answer within this FAQ item
+                    answer = faq_item.find(class_='uagb-faq-content')
+                    if answer:
+                        q_text = ' '.join(question.stripped_strings)
+                        a_text = ' '.join(answer.stripped_strings)
+                        if q_text and a_text:
+                            qa_pairs.append((q_text, a_text))
+
+            # Method 2: Generic FAQ/Accordion structure
+            if not qa_pairs:
+                questions = section.find_all(lambda tag: (
+                    tag.name in ['dt', 'summary'] or
+                    (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['question', 'header', 'title', 'summary']))) or
+                    tag.get('role') == 'tab'
+                ))
+
+                for question in questions:
+                    q_text = ' '.join(question.stripped_strings)
+                    if not q_text:
+                        continue
+
+                    # Try to find the corresponding answer
+                    answer = None
+
+                    # Check for next sibling first
+                    answer = question.find_next_sibling(lambda tag: (
+                        tag.name == 'dd' or
+                        (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['answer', 'content', 'panel', 'body']))) or
+                        tag.get('role') == 'tabpanel'
+                    ))
+
+                    # If no sibling found, try parent's next element
+                    if not answer and question.parent:
+                        answer = question.parent.find_next(lambda tag: (
+                            tag.name == 'dd' or
+                            (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['answer', 'content', 'panel', 'body']))) or
+                            tag.get('role') == 'tabpanel'
+                        ))
+
+                    if answer:
+                        a_text = ' '.join(answer.stripped_strings)
+                        if a_text:
+                            qa_pairs.append((q_text, a_text))
+
+            # Add all found Q&A pairs to paragraphs
+            for q_text, a_text in qa_pairs:
+                paragraphs.append(f"Q: {q_text}")
+                paragraphs.append(f"A: {a_text}")
+
+        if not paragraphs:
+            return "[ERROR: No content found on page]", title, meta_description
+
+        # Join paragraphs with double newlines to preserve structure
+        raw_text = "\n\n".join(paragraphs)
+        return raw_text, title, meta_description
+
+    except Exception as e:
+        return f"[ERROR: {str(e)}]", "Untitled Page", ""
+
+def run_extract(rng, scales, docs, faq_sections, paragraph_words, divergence):
+    # Times extract_page_content against the original on the generated pages
+    results = []
+    for blocks in scales:
+        pages = [make_corpus_item(rng, blocks, faq_sections, paragraph_words, divergence)[1] for _ in range(docs)]
+        timings = {}
+        for name, extract in (("reference", reference_extract_page_content), ("current", main.extract_page_content)):
+            start = time.perf_counter()
+            for page in pages:
+                extract(page)
+            timings[name] = time.perf_counter() - start
+        results.append({
+            "function": "extract_page_content",
+            "blocks": blocks,
+            "docs": docs,
+            "faq_sections": faq_sections,
+            "page_bytes_avg": sum(len(page) for page in pages) // docs,
+            "reference_s": round(timings["reference"], 6),
+            "current_s": round(timings["current"], 6),
+        })
+    return results
+
+# ------------------ Local Page Server ------------------
+
+class PageServer:
+    # Serves generated pages from memory on an ephemeral localhost port
+
+    def __init__(self):
+        self.pages = {}
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add(self, path, html):
+        self.pages[path] = html
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# ------------------ Benchmark ------------------
+
+def run_scale(server, workdir, rng, blocks, docs, faq_sections, paragraph_words, divergence, method, scorer,
+              js_faq=False, render=False):
+    timings = {stage: 0.0 for stage in STAGES}
+    bytes_fetched = 0
+    live_blocks = 0
+    similarities = []
+    for n in range(docs):
+        draft, page_html = make_corpus_item(rng, blocks, faq_sections, paragraph_words, divergence, js_faq)
+        docx_path = os.path.join(workdir, f"bench_{blocks}_{n}.docx")
+        write_docx(docx_path, draft)
+        url = server.add(f"/{blocks}/{n}.html", page_html)
+
+        start = time.perf_counter()
+        draft_text = main.get_docx_text(docx_path)
+        timings["docx_parse"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with main.get_session().get(url, timeout=main.FETCH_TIMEOUT, stream=True) as response:
+            fetched, size = main.read_html(response)
+        timings["fetch"] += time.perf_counter() - start
+        bytes_fetched += size
+
+        start = time.perf_counter()
+        live_text, title, meta_desc = main.extract_page_content(fetched)
+        timings["extract"] += time.perf_counter() - start
+
+        if render and main.is_thin(live_text, fetched):
+            start = time.perf_counter()
+            fetched = main.get_render_pool().render(url)
+            timings["render"] += time.perf_counter() - start
+            start = time.perf_counter()
+            live_text, title, meta_desc = main.extract_page_content(fetched)
+            timings["extract"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        draft_text = main.normalize_text(draft_text)
+        live_text = main.normalize_text(live_text)
+        timings["normalize"] += time.perf_counter() - start
+        live_blocks += len(main.split_into_blocks(live_text))
+
+        start = time.perf_counter()
+        diff, similarity = main.block_compare(draft_text, live_text, method=method, scorer=scorer)
+        timings["compare"] += time.perf_counter() - start
+        similarities.append(similarity)
+
+        start = time.perf_counter()
+        main.write_diff_script(io.StringIO(), "diff.js", os.path.basename(docx_path), url, title, meta_desc, similarity, diff)
+        main.format_result_as_markdown(os.path.basename(docx_path), url, title, meta_desc, similarity, diff)
+        timings["report"] += time.perf_counter() - start
+
+    return {
+        "blocks": blocks,
+        "docs": docs,
+        "faq_sections": faq_sections,
+        "paragraph_words": paragraph_words,
+        "divergence": divergence,
+        "method": method,
+        "scorer": scorer,
+        "js_faq": js_faq,
+        "render": render,
+        "live_blocks_avg": live_blocks / docs,
+        "bytes_fetched": bytes_fetched,
+        "similarity_avg": sum(similarities) / docs,
+        "seconds": {stage: round(total, 6) for stage, total in timings.items()},
+        "ms_per_doc": {stage: round(total * 1000 / docs, 3) for stage, total in timings.items()},
+    }
+
+def print_header():
+    print(f"{'blocks':>8} " + " ".join(f"{stage:>11}" for stage in STAGES) + "   (ms per document)")
+
+def print_row(result):
+    print(f"{result['blocks']:>8} " + " ".join(f"{result['ms_per_doc'][stage]:>11.1f}" for stage in STAGES))
+
+def bench_main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the comparison pipeline on a synthetic corpus.")
+    parser.add_argument("--scales", default="25,100,300", help="Comma-separated block counts per document")
+    parser.add_argument("--docs", type=int, default=3, help="Documents generated per scale")
+    parser.add_argument("--faq-sections", type=int, default=1, help="UAGB FAQ sections per page")
+    parser.add_argument("--paragraph-words", type=int, default=40, help="Words per paragraph")
+    parser.add_argument("--divergence", type=float, default=0.2, help="Fraction of blocks changed, dropped or added on the live page")
+    parser.add_argument("--method", choices=main.ALIGNMENT_METHODS, default="greedy", help="block_compare alignment engine")
+    parser.add_argument("--scorer", choices=list(main.SCORERS), default="ratio", help="block_compare similarity")
+    parser.add_argument("--js-faq", action="store_true", help="Build the FAQ sections client-side with a script")
+    parser.add_argument("--render", action="store_true", help="Render thin pages in headless Chromium (needs Playwright)")
+    parser.add_argument("--render-tabs", type=int, default=main.RENDER_TABS, help="Pages rendered at once")
+    parser.add_argument("--extract", action="store_true",
+                        help="Time extract_page_content against the original implementation on the generated pages instead")
+    parser.add_argument("--normalize", type=float, metavar="MB",
+                        help="Time the normalization functions on MB-sized inputs instead")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    if args.render and not main.playwright_available():
+        parser.error("--render needs Playwright: pip install playwright && playwright install chromium")
+    main.RENDER_TABS = args.render_tabs
+
+    rng = random.Random(args.seed)
+    results = []
+    if args.extract:
+        print(f"{'blocks':>8} {'page KB':>8} {'reference ms':>13} {'current ms':>11}   (per document)")
+        for result in run_extract(rng, [int(scale) for scale in args.scales.split(",")], args.docs,
+                                  args.faq_sections, args.paragraph_words, args.divergence):
+            results.append(result)
+            print(f"{result['blocks']:>8} {result['page_bytes_avg'] / 1000:>8.1f} "
+                  f"{result['reference_s'] * 1000 / args.docs:>13.1f} {result['current_s'] * 1000 / args.docs:>11.1f}")
+    elif args.normalize:
+        print(f"{'function':>18} {'reference s':>12} {'current s':>10}")
+        for result in run_normalize(rng, args.normalize):
+            results.append(result)
+            print(f"{result['function']:>18} {result['reference_s']:>12.3f} {result['current_s']:>10.3f}")
+    else:
+        # Measure the pipeline itself, not the page cache
+        main.CACHE_ENABLED = False
+        server = PageServer()
+        print_header()
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                for blocks in (int(scale) for scale in args.scales.split(",")):
+                    results.append(run_scale(server, workdir, rng, blocks, args.docs, args.faq_sections,
+                                             args.paragraph_words, args.divergence, args.method, args.scorer,
+                                             args.js_faq, args.render))
+                    print_row(results[-1])
+        finally:
+            server.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": args.seed,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    bench_main()
@@ -1,17 +1,50 @@
 import difflib
 import requests
-from bs4 import BeautifulSoup
-from docx import Document
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Tag
 import os
+import pathlib
 import re
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
+import json
+import time
+import hashlib
+import gzip
+import zlib
+import io
+import html
+import html.entities
+import queue
+import bisect
+import math
+import cProfile
+import sqlite3
+import zipfile
+from array import array
+import xml.etree.ElementTree as ET
+from collections import Counter, OrderedDict, namedtuple
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError  # not the builtin before Python 3.11
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+import importlib.util
+import argparse
+import asyncio
+import atexit
+import csv
 import sys
 import webbrowser
 
 # ------------------ Helper Functions ------------------
 
-def get_document_url_pairs(docx_files):
+def get_document_url_pairs(docx_files, suggestions=None):
+    # suggestions ({docx_file: UrlMatch}) pre-fill the URLs; low-confidence
+    # ones are highlighted for review
+    import tkinter as tk
+    from tkinter import messagebox
+
     match_window = tk.Toplevel()
     match_window.title("Match DOCX Files to URLs")
     window_width = 1200
@@ -26,13 +59,25 @@ def get_document_url_pairs(docx_files):
     canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
     canvas.configure(yscrollcommand=scrollbar.set)
 
-    tk.Label(scroll_frame, text="Enter the URL that matches each DOCX file:", font=("Arial", 12, "bold")).pack(pady=10)
-    for file in docx_files:
+    suggestions = suggestions or {}
+    heading = "Review the suggested URLs (highlighted ones need checking):" if suggestions else "Enter the URL that matches each DOCX file:"
+    tk.Label(scroll_frame, text=heading, font=("Arial", 12, "bold")).pack(pady=10)
+    # Low-confidence and missing suggestions first, so they get reviewed
+    for file in sorted(docx_files, key=lambda f: suggestions[f].confidence if f in suggestions else -1) if suggestions else docx_files:
         frame = tk.Frame(scroll_frame)
         frame.pack(fill="x", padx=10, pady=5)
         tk.Label(frame, text=file, width=40, anchor="w").pack(side="left")
-        url_entry = tk.Entry(frame, width=100)
+        url_entry = tk.Entry(frame, width=90)
         url_entry.pack(side="left", padx=5, fill="x", expand=True)
+        if suggestions:
+            match = suggestions.get(file)
+            review = match is None or match.confidence < MATCH_CONFIDENCE
+            if match:
+                url_entry.insert(0, match.url)
+            if review:
+                url_entry.configure(background="#fff3cd")
+            tk.Label(frame, text=f"{match.confidence:.0%}" if match else "no match", width=10,
+                     fg="#b35900" if review else "#2e7d32").pack(side="left")
         entries.append((file, url_entry))
 
     matched_pairs = []
@@ -55,17 +100,627 @@ def get_document_url_pairs(docx_files):
     match_window.wait_window()
     return matched_pairs
 
-# ------------------ Remaining Functions ------------------
+# ------------------ Fetching ------------------
+
+FETCH_WORKERS = 8
+PER_HOST_LIMIT = 4
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+FETCH_TIMEOUT = (5, 20)  # (connect, read) seconds; read is the longest gap between bytes
+FETCH_DEADLINE = 60  # seconds for a whole page body, so a trickling server can't hold a worker
+FETCH_MAX_BYTES = 10 * 1024 * 1024  # decoded page size limit
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+CHARSET_SNIFF_BYTES = 64 * 1024
+CHARSET_PARAM_RE = re.compile(r"""charset\s*=\s*["']?([-\w.:]+)""", re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+
+_session = None
+_session_lock = threading.Lock()
+_host_slots = {}
+
+def get_session():
+    # One keep-alive session shared by every fetch so connections are reused
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            retry = Retry(
+                total=FETCH_RETRIES,
+                backoff_factor=FETCH_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def _page_encoding(response, prefix):
+    # BOM, then the Content-Type charset, then a <meta> charset, then UTF-8 if
+    # it decodes, all from the first CHARSET_SNIFF_BYTES rather than the whole body
+    for bom, encoding in ((b"\xef\xbb\xbf", "utf-8-sig"), (b"\xff\xfe", "utf-16"), (b"\xfe\xff", "utf-16")):
+        if prefix.startswith(bom):
+            return encoding
+    match = CHARSET_PARAM_RE.search(response.headers.get("Content-Type", ""))
+    if match:
+        return match.group(1)
+    match = META_CHARSET_RE.search(prefix)
+    if match:
+        return match.group(1).decode("ascii")
+    try:
+        prefix.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.reason != "unexpected end of data":  # not just a character cut off by the prefix
+            return "windows-1252"  # what browsers assume for undeclared legacy pages
+    return "utf-8"
 
-def get_webpage_text(url):
+def _body_chunks(response, size=64 * 1024):
+    # Yields the decoded body in pieces of at most about size bytes. read1()
+    # returns whatever has arrived, so callers get control back even from a
+    # trickling server, and gzip/deflate are inflated here with a size cap per
+    # call so a small compressed body can't expand into one huge chunk.
+    encoding = response.headers.get("Content-Encoding", "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == "deflate":
+        inflater = zlib.decompressobj()
+    else:
+        inflater = None
+    raw = response.raw
+    read = getattr(raw, "read1", None) or raw.read  # read1 needs urllib3 2
+    decode_content = encoding not in ("", "identity") and inflater is None  # let urllib3 handle br and friends
+    while True:
+        chunk = read(size, decode_content=decode_content)
+        if not chunk:
+            return
+        if inflater is None:
+            yield chunk
+            continue
+        while chunk:
+            yield inflater.decompress(chunk, size)
+            chunk = inflater.unconsumed_tail
+
+def read_html(response, max_bytes=None):
+    # Streams an HTML body from a stream=True response. Rejects other content
+    # types before reading, and stops at max_bytes (after decompression) or
+    # FETCH_DEADLINE. Returns (text, decoded byte count).
+    max_bytes = FETCH_MAX_BYTES if max_bytes is None else max_bytes
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise ValueError(f"Not an HTML page ({content_type})")
+    if int(response.headers.get("Content-Length") or 0) > max_bytes:
+        raise ValueError(f"Page larger than {max_bytes} bytes")
+    deadline = time.monotonic() + FETCH_DEADLINE
+    body = bytearray()
+    for chunk in _body_chunks(response):
+        body += chunk
+        if len(body) > max_bytes:
+            raise ValueError(f"Page larger than {max_bytes} bytes")
+        if time.monotonic() > deadline:
+            raise ValueError(f"Page took longer than {FETCH_DEADLINE}s to download")
+    encoding = _page_encoding(response, bytes(body[:CHARSET_SNIFF_BYTES]))
+    try:
+        return body.decode(encoding, errors="replace"), len(body)
+    except LookupError:
+        return body.decode("utf-8", errors="replace"), len(body)
+
+def _host_slot(url):
+    host = urlsplit(url).netloc.lower()
+    with _session_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.Semaphore(PER_HOST_LIMIT)
+        return _host_slots[host]
+
+def _fetch_one(url, on_start=None):
+    metrics = {}
+    start = time.perf_counter()
+    with _host_slot(url):
+        metrics["queued_s"] = time.perf_counter() - start
+        if on_start:
+            on_start()
+        page = get_webpage_text(url, metrics)
+    metrics["fetch_s"] = time.perf_counter() - start - metrics["queued_s"]
+    return page, metrics
+
+def fetch_pages(urls, max_workers=FETCH_WORKERS, on_start=None):
+    # Yields (index, (text, title, meta_description), fetch metrics) as each page arrives.
+    # on_start(index) is called from the fetching thread when a request begins.
+    urls = list(urls)
+    if not urls:
+        return
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)))
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        futures = {
+            executor.submit(_fetch_one, url, (lambda i=i: on_start(i)) if on_start else None): i
+            for i, url in enumerate(urls)
         }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
+        for future in as_completed(futures):
+            page, metrics = future.result()
+            yield futures[future], page, metrics
+    finally:
+        # Don't wait on outstanding fetches if the consumer stopped early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# ------------------ Page Cache ------------------
+
+CACHE_ENABLED = True
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".docweb_cache")
+CACHE_TTL = 0  # seconds a cached page is trusted without revalidating
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+OFFLINE = False  # serve only from the cache, never touch the network
+CACHE_EVICT_TO = 0.9  # eviction frees space down to this fraction of the limit, so it rescans rarely
+
+class PageCache:
+    # On-disk cache of fetched pages keyed by URL. Each entry is a JSON file with
+    # the validators and extracted content plus the raw HTML alongside it.
+    # File mtimes double as last-access times for LRU eviction.
+
+    def __init__(self, directory, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self._files())
+
+    def _files(self):
+        return [entry.path for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".tmp")]
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".json"), os.path.join(self.directory, key + ".html")
+
+    def get(self, url):
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(meta_path)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def get_html(self, url):
+        _, html_path = self._paths(url)
+        try:
+            with open(html_path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url, entry, html=None):
+        meta_path, html_path = self._paths(url)
+        entry = dict(entry, url=url)
+        with self.lock:
+            files = [(meta_path, json.dumps(entry))]
+            if html is not None:
+                files.append((html_path, html))
+            for path, data in files:
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(path + ".tmp", path)
+                self.size += os.path.getsize(path) - old_size
+            self._evict()
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        # Drop least recently used entries (by JSON mtime) until well under the
+        # limit, so the next scan is many puts away
+        target = self.max_bytes * CACHE_EVICT_TO
+        entries = sorted(
+            (os.path.getmtime(path), path[:-len(".json")])
+            for path in self._files() if path.endswith(".json")
+        )
+        for _, stem in entries:
+            if self.size <= target:
+                break
+            for path in (stem + ".json", stem + ".html"):
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    self.size -= size
+                except OSError:
+                    pass
+
+_page_cache = None
+
+def get_page_cache():
+    global _page_cache
+    if not CACHE_ENABLED:
+        return None
+    with _session_lock:
+        if _page_cache is None or _page_cache.directory != CACHE_DIR:
+            _page_cache = PageCache(CACHE_DIR, CACHE_MAX_BYTES)
+        return _page_cache
+
+def _cached_result(entry):
+    return entry["text"], entry["title"], entry["meta_description"]
+
+def _cached_links(cache, url, entry):
+    # Entries cached before links were recorded fall back to the stored HTML
+    if "links" in entry:
+        return entry["links"]
+    page_html = cache.get_html(url)
+    return extract_links(page_html, url) if page_html else []
+
+# ------------------ Rendering ------------------
+
+RENDER_ENABLED = False  # render thin pages in a headless browser (needs Playwright)
+RENDER_TABS = 4  # warm browser contexts, i.e. pages rendered at once
+RENDER_TIMEOUT = 20  # seconds to wait for a page to settle
+RENDER_CALL_TIMEOUT = 120  # seconds render() waits in all, including for a free context
+RENDER_MIN_CHARS = 200  # static extraction shorter than this is treated as a shell
+RENDER_BLOCKED_TYPES = {"image", "media", "font"}
+RENDER_BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+    "hotjar.com", "clarity.ms", "segment.io", "youtube.com",
+)
+# Markup for a FAQ or accordion; if it's there but no Q&A came out, it's built by script
+STRUCTURED_SHELL_RE = re.compile(r"""class\s*=\s*["'][^"']*(faq|accordion)""", re.IGNORECASE)
+
+def is_thin(text, page_html):
+    # Whether a static extraction looks like an unrendered shell: no content,
+    # very little text, or FAQ/accordion markup with no questions taken from it
+    if text.startswith("[ERROR") or len(text) < RENDER_MIN_CHARS:
+        return True
+    return "Q: " not in text and STRUCTURED_SHELL_RE.search(page_html) is not None
+
+async def _route_request(route):
+    request = route.request
+    host = urlsplit(request.url).hostname or ""
+    if request.resource_type in RENDER_BLOCKED_TYPES or any(host == blocked or host.endswith("." + blocked) for blocked in RENDER_BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+def playwright_available():
+    # Checked without importing it, which takes a while
+    return importlib.util.find_spec("playwright") is not None
+
+class RenderPool:
+    # Headless Chromium with a fixed set of warm browser contexts, driven by an
+    # event loop on its own thread. render() can be called from any thread; up
+    # to tabs pages render at once and each context is reused afterwards, so
+    # browser startup is paid once per run rather than per URL.
+
+    def __init__(self, tabs=RENDER_TABS):
+        # Imported here so runs that never render don't pay for it
+        try:
+            from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+        except ImportError:  # optional: only needed to render JS-built pages
+            raise RuntimeError("Rendering needs Playwright: pip install playwright && playwright install chromium") from None
+        self.async_playwright = async_playwright
+        self.timeout_error = PlaywrightTimeoutError
+        self.tabs = tabs
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        try:
+            self._call(self._start())
+        except Exception:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            raise
+
+    def _call(self, coroutine, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except FuturesTimeoutError:
+            # Cancelling runs the coroutine's cleanup on the loop
+            future.cancel()
+            raise
+
+    async def _start(self):
+        self.playwright = await self.async_playwright().start()
+        try:
+            self.browser = await self.playwright.chromium.launch()
+        except Exception:
+            await self.playwright.stop()
+            raise
+        self.contexts = asyncio.Queue()
+        for _ in range(self.tabs):
+            self.contexts.put_nowait(await self._new_context())
+
+    async def _new_context(self):
+        context = await self.browser.new_context(user_agent=get_session().headers["User-Agent"])
+        await context.route("**/*", _route_request)
+        return context
+
+    async def _replace_context(self, context):
+        # A context that can't be reset is closed and a fresh one takes its
+        # place. If that fails too, the old one is kept so the pool never
+        # shrinks; the next render through it fails and tries again.
+        try:
+            await asyncio.wait_for(context.close(), RENDER_TIMEOUT)
+        except Exception:
+            pass
+        try:
+            return await asyncio.wait_for(self._new_context(), RENDER_TIMEOUT)
+        except Exception:
+            return context
+
+    async def _load(self, context, url):
+        page = await context.new_page()
+        try:
+            try:
+                await page.goto(url, wait_until="networkidle", timeout=RENDER_TIMEOUT * 1000)
+            except self.timeout_error:
+                pass  # long polling never goes idle; take what has rendered
+            return await page.content()
+        finally:
+            await page.close()
+
+    async def _render(self, url):
+        # Waiting for a free context doesn't count against the timeout
+        context = await self.contexts.get()
+        try:
+            return await asyncio.wait_for(self._load(context, url), RENDER_TIMEOUT * 2)
+        finally:
+            try:
+                await asyncio.wait_for(context.clear_cookies(), RENDER_TIMEOUT)
+            except Exception:
+                context = await self._replace_context(context)
+            finally:
+                self.contexts.put_nowait(context)
+
+    def render(self, url, timeout=RENDER_CALL_TIMEOUT):
+        # The page's HTML after its scripts have run. Raises
+        # concurrent.futures.TimeoutError if that takes more than timeout
+        # seconds, waiting for a context included.
+        return self._call(self._render(url), timeout)
+
+    def close(self):
+        async def stop():
+            await self.browser.close()
+            await self.playwright.stop()
+
+        try:
+            self._call(stop(), timeout=RENDER_TIMEOUT)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+_render_pool = None
+_render_pool_error = None
+_render_pool_lock = threading.Lock()
+
+def get_render_pool():
+    # Started on first use and shut down when the program exits. If the browser
+    # can't start, every later call raises the same error instead of retrying.
+    global _render_pool, _render_pool_error
+    with _render_pool_lock:
+        if _render_pool_error is not None:
+            raise _render_pool_error
+        if _render_pool is None:
+            try:
+                _render_pool = RenderPool(RENDER_TABS)
+            except Exception as e:
+                _render_pool_error = e
+                raise
+            atexit.register(_render_pool.close)
+        return _render_pool
+
+def render_page(url, metrics):
+    # The rendered HTML, or None if rendering failed; records the outcome and
+    # time in metrics
+    start = time.perf_counter()
+    try:
+        rendered = get_render_pool().render(url)
+        metrics["render"] = "rendered"
+    except Exception:
+        rendered = None
+        metrics["render"] = "failed"
+    metrics["render_s"] = time.perf_counter() - start
+    return rendered
+
+def _render_cached(cache, url, entry, metrics, key=None):
+    # A thin page cached without rendering (cached before --render was used,
+    # or its render failed) is rendered now and the entry updated, so cache
+    # hits and 304s get the same result as a fresh download. key is the cache
+    # key when url is where the page was redirected to.
+    if not RENDER_ENABLED or entry.get("rendered"):
+        return entry
+    thin = entry.get("thin")
+    if thin is None:
+        # Entries from before the flag was stored
+        thin = is_thin(entry["text"], cache.get_html(key or url) or "")
+    if not thin:
+        return entry
+    rendered = render_page(url, metrics)
+    if rendered is None:
+        return entry
+    start = time.perf_counter()
+    text, title, meta_description = extract_page_content(rendered)
+    metrics["extract_s"] += time.perf_counter() - start
+    entry = dict(entry, text=text, title=title, meta_description=meta_description,
+                 links=extract_links(rendered, url), thin=True, rendered=True)
+    cache.put(key or url, entry, rendered)
+    return entry
+
+# ------------------ Remaining Functions ------------------
+
+def get_webpage_text(url, metrics=None, links=None):
+    # metrics, if given, collects bytes downloaded, cache outcome and extract time.
+    # links, if given, is extended with the page's absolute link targets.
+    metrics = {} if metrics is None else metrics
+    metrics.update(bytes=0, cache="off", extract_s=0.0)
+    try:
+        cache = get_page_cache()
+        entry = cache.get(url) if cache else None
+        if entry and (OFFLINE or time.time() - entry["fetched_at"] < CACHE_TTL):
+            metrics["cache"] = "hit"
+            entry = _render_cached(cache, url, entry, metrics)
+            if links is not None:
+                links.extend(_cached_links(cache, url, entry))
+            return _cached_result(entry)
+        if OFFLINE:
+            metrics["cache"] = "miss"
+            return "[ERROR: Page not in cache (offline mode)]", "Untitled Page", ""
+
+        if cache:
+            metrics["cache"] = "miss"
+
+        # Revalidate what we have instead of downloading it again
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        with get_session().get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True) as response:
+            if response.status_code == 304 and entry:
+                metrics["cache"] = "revalidated"
+                entry["fetched_at"] = time.time()
+                entry["etag"] = response.headers.get("ETag", entry.get("etag"))
+                entry["last_modified"] = response.headers.get("Last-Modified", entry.get("last_modified"))
+                cache.put(url, entry)
+                entry = _render_cached(cache, response.url, entry, metrics, key=url)
+                if links is not None:
+                    links.extend(_cached_links(cache, url, entry))
+                return _cached_result(entry)
+            response.raise_for_status()
+            html, metrics["bytes"] = read_html(response)
+        start = time.perf_counter()
+        text, title, meta_description = extract_page_content(html)
+        metrics["extract_s"] = time.perf_counter() - start
+        thin = is_thin(text, html)
+        rendered = render_page(response.url, metrics) if RENDER_ENABLED and thin else None
+        if rendered is not None:
+            # Rendered markup goes through the same extraction; if rendering
+            # fails the static result stands
+            html = rendered
+            start = time.perf_counter()
+            text, title, meta_description = extract_page_content(html)
+            metrics["extract_s"] += time.perf_counter() - start
+        page_links = extract_links(html, response.url) if cache or links is not None else []
+        if links is not None:
+            links.extend(page_links)
+        if cache:
+            cache.put(url, {
+                "fetched_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "text": text,
+                "title": title,
+                "meta_description": meta_description,
+                "links": page_links,
+                "thin": thin,
+                "rendered": rendered is not None,
+            }, html)
+        return text, title, meta_description
+
+    except requests.exceptions.RequestException as e:
+        return f"[ERROR: Failed to fetch webpage: {str(e)}]", "Untitled Page", ""
+    except Exception as e:
+        return f"[ERROR: {str(e)}]", "Untitled Page", ""
+
+HTML_PARSER = "html.parser"  # "lxml" is faster, but repairs broken markup differently
+
+HREF_RE = re.compile(r"""<a\s[^>]*?\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+def extract_links(page_html, base_url):
+    # Absolute targets of every <a href>, in page order without duplicates. A
+    # regex rather than a parse, since crawling only needs the hrefs.
+    links = []
+    for match in HREF_RE.finditer(page_html):
+        href = html.unescape(next(group for group in match.groups() if group is not None)).strip()
+        if href and not href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            links.append(urljoin(base_url, href))
+    return list(dict.fromkeys(links))
+
+CONTENT_TAGS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+# Class keywords marking structured sections whose text is extracted as Q&A instead
+STRUCTURED_KEYWORDS = (
+    'faq', 'accordion', 'expandable', 'collapse', 'toggle',
+    'uagb-faq', 'uagb-container', 'wp-block-uagb'
+)
+
+# Structured section patterns, in the order their matches are reported.
+# Each is called with the tag's class list, its space-joined classes and its role.
+STRUCTURED_PATTERNS = (
+    # UAGB FAQ patterns
+    lambda classes, joined, role: any(c.startswith('uagb-faq') for c in classes),
+    lambda classes, joined, role: any(c.startswith('wp-block-uagb-faq') for c in classes),
+    # Generic FAQ patterns
+    lambda classes, joined, role: any(keyword in joined.lower() for keyword in ['faq', 'frequently-asked']),
+    # Accordion patterns
+    lambda classes, joined, role: any(keyword in joined.lower() for keyword in ['accordion', 'expandable', 'collapse']),
+    # ARIA patterns
+    lambda classes, joined, role: role == 'tablist',
+    lambda classes, joined, role: role == 'tab',
+    # Container patterns
+    lambda classes, joined, role: 'uagb-container-inner-blocks-wrap' in joined,
+)
+
+def _class_list(tag):
+    classes = tag.get('class') or []
+    return classes.split() if isinstance(classes, str) else classes
+
+def _is_structured(tag):
+    joined = ' '.join(_class_list(tag)).lower()
+    return any(keyword in joined for keyword in STRUCTURED_KEYWORDS)
+
+def _is_question(tag):
+    return (
+        tag.name in ['dt', 'summary'] or
+        any(keyword in c.lower() for c in _class_list(tag) for keyword in ['question', 'header', 'title', 'summary']) or
+        tag.get('role') == 'tab'
+    )
+
+def _is_answer(tag):
+    return (
+        tag.name == 'dd' or
+        any(keyword in c.lower() for c in _class_list(tag) for keyword in ['answer', 'content', 'panel', 'body']) or
+        tag.get('role') == 'tabpanel'
+    )
+
+def _tag_shape(tag):
+    return tag.name, tuple((k, ' '.join(v) if isinstance(v, list) else v) for k, v in tag.attrs.items())
+
+def _classify_content(main):
+    # Returns (regular content tags, structured sections) for the content area.
+    # Regular tags are non-empty p/li/h* elements with no structured ancestor;
+    # sections are grouped by pattern and deduplicated by their markup.
+    inside = {id(main): any(_is_structured(parent) for parent in main.parents)}
+    regular = []
+    matches = [[] for _ in STRUCTURED_PATTERNS]
+    for tag in main.find_all(True):
+        parent = tag.parent
+        inside[id(tag)] = in_section = inside[id(parent)] or _is_structured(parent)
+        if tag.name in CONTENT_TAGS and not in_section and tag.get_text(strip=True):
+            regular.append(tag)
+        classes = _class_list(tag)
+        role = tag.get('role')
+        if not classes and role is None:
+            continue
+        joined = ' '.join(classes)
+        for pattern, found in zip(STRUCTURED_PATTERNS, matches):
+            if pattern(classes, joined, role):
+                found.append(tag)
+
+    # Remove duplicates while preserving order. Identical markup can only come
+    # from tags with the same name, attributes and text, so only those get serialized.
+    unique = list({id(tag): tag for found in matches for tag in found}.values())
+    shapes = [_tag_shape(tag) for tag in unique]
+    shape_counts = Counter(shapes)
+    shapes = [(shape, tag.get_text()) if shape_counts[shape] > 1 else shape for shape, tag in zip(shapes, unique)]
+    shape_counts = Counter(shapes)
+    sections = []
+    seen = set()
+    for tag, shape in zip(unique, shapes):
+        if shape_counts[shape] > 1:
+            markup = str(tag)
+            if markup in seen:
+                continue
+            seen.add(markup)
+        sections.append(tag)
+    return regular, sections
+
+def extract_page_content(html):
+    try:
+        soup = BeautifulSoup(html, HTML_PARSER)
         
         # Get title
         title = "Untitled Page"
@@ -90,32 +745,16 @@ def get_webpage_text(url):
         if not main:
             return "[ERROR: Could not find main content area]", title, meta_description
         
+        # Classify every element in a single walk of the content area
+        regular_tags, structured_sections = _classify_content(main)
+
         # Extract clean paragraphs while preserving structure
         paragraphs = []
         
         # First, handle regular content
-        for tag in main.find_all(["p", "li", "h1", "h2", "h3", "h4", "h5", "h6"]):
-            # Skip empty tags
-            if not tag.get_text(strip=True):
-                continue
-                
-            # Skip if inside structured content section to avoid duplication
-            if tag.find_parent(class_=lambda x: x and any(keyword in str(x).lower() for keyword in [
-                'faq', 'accordion', 'expandable', 'collapse', 'toggle',
-                'uagb-faq', 'uagb-container', 'wp-block-uagb'
-            ])):
-                continue
-                
-            # Create a copy to work with
-            tag_copy = BeautifulSoup(str(tag), "html.parser")
-            
-            # Handle links by preserving their text
-            for a in tag_copy.find_all('a'):
-                if a.get_text(strip=True):
-                    a.unwrap()
-            
-            # Get the complete text of the element
-            text = tag_copy.get_text(" ", strip=True)
+        for tag in regular_tags:
+            # Link text is kept as-is, so the element text already includes it
+            text = tag.get_text(" ", strip=True)
             if text and len(text) > 1:
                 # Preserve heading tags
                 if tag.name.startswith('h'):
@@ -123,36 +762,13 @@ def get_webpage_text(url):
                 else:
                     paragraphs.append(text)
         
-        # Then, handle structured content sections
-        structured_content_patterns = [
-            # UAGB FAQ patterns
-            {'class_': lambda x: x and any(c for c in str(x).split() if c.startswith('uagb-faq'))},
-            {'class_': lambda x: x and any(c for c in str(x).split() if c.startswith('wp-block-uagb-faq'))},
-            # Generic FAQ patterns
-            {'class_': lambda x: x and any(keyword in str(x).lower() for keyword in ['faq', 'frequently-asked'])},
-            # Accordion patterns
-            {'class_': lambda x: x and any(keyword in str(x).lower() for keyword in ['accordion', 'expandable', 'collapse'])},
-            # ARIA patterns
-            {'role': 'tablist'},
-            {'role': 'tab'},
-            # Container patterns
-            {'class_': lambda x: x and 'uagb-container-inner-blocks-wrap' in str(x)}
-        ]
-        
-        # Find all structured content sections
-        structured_sections = []
-        for pattern in structured_content_patterns:
-            sections = main.find_all(**pattern)
-            structured_sections.extend(sections)
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        structured_sections = [x for x in structured_sections if not (str(x) in seen or seen.add(str(x)))]
-        
         # Process each structured section
         for section in structured_sections:
+            # Walk the section once; the lookups below all work off this list
+            descendants = section.find_all(True)
+
             # Try to find a section heading first
-            section_heading = section.find(class_=lambda x: x and 'uagb-heading-text' in str(x))
+            section_heading = next((tag for tag in descendants if 'uagb-heading-text' in ' '.join(_class_list(tag))), None)
             if section_heading and section_heading.get_text(strip=True):
                 paragraphs.append(f"<h2>{section_heading.get_text(strip=True)}</h2>")
             
@@ -160,13 +776,13 @@ def get_webpage_text(url):
             qa_pairs = []
             
             # Method 1: UAGB FAQ structure
-            questions = section.find_all(class_='uagb-question')
+            questions = [tag for tag in descendants if 'uagb-question' in _class_list(tag)]
             for question in questions:
                 # Get the FAQ item container
-                faq_item = question.find_parent(class_=lambda x: x and 'uagb-faq-item' in str(x))
+                faq_item = next((parent for parent in question.parents if 'uagb-faq-item' in ' '.join(_class_list(parent))), None)
                 if faq_item:
                     # Find the answer within this FAQ item
-                    answer = faq_item.find(class_='uagb-faq-content')
+                    answer = next((tag for tag in faq_item.descendants if isinstance(tag, Tag) and 'uagb-faq-content' in _class_list(tag)), None)
                     if answer:
                         q_text = ' '.join(question.stripped_strings)
                         a_text = ' '.join(answer.stripped_strings)
@@ -175,34 +791,19 @@ def get_webpage_text(url):
             
             # Method 2: Generic FAQ/Accordion structure
             if not qa_pairs:
-                questions = section.find_all(lambda tag: (
-                    tag.name in ['dt', 'summary'] or
-                    (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['question', 'header', 'title', 'summary']))) or
-                    tag.get('role') == 'tab'
-                ))
+                questions = [tag for tag in descendants if _is_question(tag)]
                 
                 for question in questions:
                     q_text = ' '.join(question.stripped_strings)
                     if not q_text:
                         continue
                     
-                    # Try to find the corresponding answer
-                    answer = None
-                    
                     # Check for next sibling first
-                    answer = question.find_next_sibling(lambda tag: (
-                        tag.name == 'dd' or
-                        (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['answer', 'content', 'panel', 'body']))) or
-                        tag.get('role') == 'tabpanel'
-                    ))
+                    answer = next((tag for tag in question.next_siblings if isinstance(tag, Tag) and _is_answer(tag)), None)
                     
                     # If no sibling found, try parent's next element
                     if not answer and question.parent:
-                        answer = question.parent.find_next(lambda tag: (
-                            tag.name == 'dd' or
-                            (tag.get('class') and any(c for c in tag.get('class', []) if any(keyword in c.lower() for keyword in ['answer', 'content', 'panel', 'body']))) or
-                            tag.get('role') == 'tabpanel'
-                        ))
+                        answer = next((tag for tag in question.parent.next_elements if isinstance(tag, Tag) and _is_answer(tag)), None)
                     
                     if answer:
                         a_text = ' '.join(answer.stripped_strings)
@@ -221,54 +822,578 @@ def get_webpage_text(url):
         raw_text = "\n\n".join(paragraphs)
         return raw_text, title, meta_description
         
-    except requests.exceptions.RequestException as e:
-        return f"[ERROR: Failed to fetch webpage: {str(e)}]", "Untitled Page", ""
     except Exception as e:
         return f"[ERROR: {str(e)}]", "Untitled Page", ""
 
-def get_docx_text(path):
-    doc = Document(path)
-    paragraphs = []
-    for p in doc.paragraphs:
-        if p.text.strip():
-            # Preserve formatting for headings
-            if p.style.name.startswith('Heading'):
-                paragraphs.append(f"<h{p.style.name[-1]}>{p.text}</h{p.style.name[-1]}>")
-            else:
-                paragraphs.append(p.text)
+DOCX_CACHE_SIZE = 64  # extracted drafts kept in memory, keyed by (path, mtime, size)
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_docx_cache = OrderedDict()
+_docx_cache_lock = threading.Lock()
+
+def _docx_style_names(archive):
+    # Maps paragraph style ids ("Heading1") to their names ("heading 1")
+    try:
+        styles = archive.open("word/styles.xml")
+    except KeyError:
+        return {}
+    names = {}
+    with styles:
+        for _, el in ET.iterparse(styles):
+            if el.tag == W_NS + "style":
+                name = el.find(W_NS + "name")
+                style_id = el.get(W_NS + "styleId")
+                names[style_id] = name.get(W_NS + "val") if name is not None else style_id
+                el.clear()
+    return names
+
+def _docx_heading_level(style_name):
+    if style_name and style_name.lower().startswith("heading") and style_name[-1].isdigit():
+        return style_name[-1]
+    return None
+
+DOCX_TEXT_VERSION = 2  # bump whenever read_docx_text's output changes, so stored results are compared again
+
+def read_docx_text(path):
+    # Streams word/document.xml out of the zip instead of loading the whole
+    # document, so memory stays flat for long drafts. Every paragraph with text
+    # becomes a block, including table cells, list items, text boxes and
+    # hyperlinks; headings keep their level as <hN> like the live extraction.
+    with zipfile.ZipFile(path) as archive:
+        styles = _docx_style_names(archive)
+        paragraphs = []
+        buffers = []
+        runs = []  # open w:r elements in each open paragraph; tabs and breaks only count inside one
+        fallback = 0  # inside mc:Fallback, which repeats the mc:Choice content
+        with archive.open("word/document.xml") as document:
+            for event, el in ET.iterparse(document, events=("start", "end")):
+                tag = el.tag
+                if event == "start":
+                    if tag == W_NS + "p":
+                        buffers.append([])
+                        runs.append(0)
+                    elif tag == W_NS + "r" and runs:
+                        runs[-1] += 1
+                    elif tag == MC_FALLBACK:
+                        fallback += 1
+                    continue
+                if tag == MC_FALLBACK:
+                    fallback -= 1
+                elif tag == W_NS + "r" and runs:
+                    runs[-1] -= 1
+                elif not buffers or fallback:
+                    if tag == W_NS + "p":
+                        buffers.pop()
+                        runs.pop()
+                        el.clear()
+                elif tag == W_NS + "t":
+                    buffers[-1].append(el.text or "")
+                elif tag == W_NS + "tab" and runs[-1]:
+                    # Outside a run, w:tab is a tab stop in the paragraph properties
+                    buffers[-1].append("\t")
+                elif tag in (W_NS + "br", W_NS + "cr") and runs[-1]:
+                    buffers[-1].append("\n")
+                elif tag == W_NS + "p":
+                    runs.pop()
+                    text = "".join(buffers.pop())
+                    if text.strip():
+                        style = el.find(f"{W_NS}pPr/{W_NS}pStyle")
+                        level = _docx_heading_level(styles.get(style.get(W_NS + "val")) if style is not None else None)
+                        paragraphs.append(f"<h{level}>{text}</h{level}>" if level else text)
+                    # Text box paragraphs were already emitted, so clearing
+                    # also keeps them out of the enclosing paragraph
+                    el.clear()
+                elif tag == W_NS + "tbl":
+                    el.clear()
     return "\n\n".join(paragraphs)
 
+def get_docx_text(path):
+    # read_docx_text, memoized by (path, mtime, size) so unchanged drafts
+    # matched to several URLs, or compared again, are only parsed once
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _docx_cache_lock:
+        if key in _docx_cache:
+            _docx_cache.move_to_end(key)
+            return _docx_cache[key]
+    text = read_docx_text(path)
+    with _docx_cache_lock:
+        _docx_cache[key] = text
+        while len(_docx_cache) > DOCX_CACHE_SIZE:
+            _docx_cache.popitem(last=False)
+    return text
+
+# ------------------ Normalization ------------------
+
+# normalize_text only rewrites runs that change: 3+ newlines, and space runs
+# that contain a tab or more than one space
+NEWLINE_RUN_RE = re.compile(r"\n{3,}")
+SPACE_RUN_RE = re.compile(r"[ \t]{2,}|\t")
+LABEL_COLON_RE = re.compile(r"([a-zA-Z])\s*:\s+")
+
+# One token per tag, comment, declaration, entity or stray markup character,
+# plus whitespace right before a tag, which may be all the text between two
+# tags. Script and style bodies are matched whole since they are raw text.
+# Quotes only protect ">" in start tags; an end tag stops at the first ">".
+# "</" followed by anything but a letter, up to the next ">", is a bogus
+# comment to html.parser, so "</ >" is dropped like a comment. A bare "</>"
+# is dropped without a trace: the text on either side of it runs together.
+HTML_TOKEN_RE = re.compile(r"""
+    <!--(?P<comment>.*?)(?:-->|\Z)
+  | <(?P<raw>script|style)\b(?:[^>"']|"[^"]*"|'[^']*')*>(?P<body>.*?)(?P<raw_end></(?P=raw)\s*>)
+  | <(?P<end>/)?(?P<name>[a-zA-Z][^\s/>]*)(?P<attrs>(?(end)[^>]*|(?:[^>"']|"[^"]*"|'[^']*')*))>
+  | </(?P<bogus>[^a-zA-Z>][^>]*)?>
+  | <[!?][^>]*>
+  | &(?P<entity>\#[0-9]+|\#[xX][0-9a-fA-F]+|[a-zA-Z][-.a-zA-Z0-9]*);?
+  | (?P<space>[ \t\n\r\f]+(?:</>[ \t\n\r\f]*)*)(?=</?[a-zA-Z!?]|</[^>]+>)
+  | [&<>]
+""", re.DOTALL | re.VERBOSE)
+QUOTED_VALUE_RE = re.compile(r"""=\s*("[^"]*"|'[^']*')""")
+# The original normalize_html passes, still used on raw comment and script
+# text, which is not escaped and so can contain markup
+RAW_MARKUP_PASSES = [
+    (re.compile(r"<ul.*?>"), ""),
+    (re.compile(r"</ul.*?>"), ""),
+    (re.compile(r"<li.*?>"), "• "),
+    (re.compile(r"</li.*?>"), ""),
+    (re.compile(r"</?(strong|b)>", re.IGNORECASE), ""),
+    (re.compile(r"<[^>]+>"), ""),
+]
+MARKUP_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+ASCII_SPACES = " \t\n\r\f"
+PRESERVE_WHITESPACE_TAGS = ("pre", "textarea")
+
+def _normalize_whitespace(text):
+    # Each pass is skipped when a plain substring check shows nothing to do
+    if "\r" in text:
+        text = text.replace("\r", "")
+    if "\n\n\n" in text:
+        text = NEWLINE_RUN_RE.sub("\n\n", text)
+    if "\t" in text or "  " in text:
+        text = SPACE_RUN_RE.sub(" ", text)
+    return text
+
 def normalize_text(text):
     # Only normalize whitespace and line breaks, preserve the rest
-    text = re.sub(r"\r", "", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    return text.strip()
+    return _normalize_whitespace(text).strip()
+
+def _strip_raw_markup(text):
+    for pattern, replacement in RAW_MARKUP_PASSES:
+        text = pattern.sub(replacement, text)
+    return text
+
+def _escape_markup(text):
+    return "".join(MARKUP_ESCAPES.get(c, c) for c in text)
+
+def _decode_entity(entity):
+    # Same decoding as BeautifulSoup's html.parser builder, including its
+    # windows-1252 reading of &#128;-&#159;
+    if entity[0] == "#":
+        number = int(entity[2:], 16) if entity[1] in "xX" else int(entity[1:])
+        if number < 256:
+            try:
+                return bytes([number]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        try:
+            return chr(number)
+        except (ValueError, OverflowError):
+            return "\N{REPLACEMENT CHARACTER}"
+    return html.entities.html5.get(entity + ";", "&" + entity)
+
+def _collapse_space(text):
+    # BeautifulSoup keeps text that is only whitespace as one newline or space
+    return "\n" if "\n" in text else " "
+
+def _normalize_html_token(m, state):
+    # state is [end of the last tag, comment or declaration, open <pre>/<textarea> tags]
+    token = m.group()
+    if m.group("space"):
+        if m.start() == state[0] and not state[1]:
+            return _collapse_space(token)
+        return token.replace("</>", "")
+    if m.group("entity"):
+        # html.parser drops the "&" of an "&x" that ends the input
+        if m.end() == len(m.string) and len(token) == 2 and token[1].isalpha():
+            return token[1]
+        return _escape_markup(_decode_entity(m.group("entity")))
+    if len(token) == 1:
+        return MARKUP_ESCAPES[token]
+    if token == "</>":
+        if m.start() == state[0]:
+            state[0] = m.end()
+        return ""
+    state[0] = m.end()
+    if m.group("name"):
+        name = m.group("name").lower()
+        if name in PRESERVE_WHITESPACE_TAGS and not m.group("attrs").endswith("/"):
+            state[1] = max(0, state[1] - 1) if m.group("end") else state[1] + 1
+        # <li...> becomes a bullet, as long as the re-serialized tag is on one line
+        if not m.group("end") and name.startswith("li") and not any(
+            "\n" in html.unescape(value) for value in QUOTED_VALUE_RE.findall(m.group("attrs"))
+        ):
+            return "• "
+        return ""
+    if m.group("raw"):
+        body = m.group("body")
+        if body and not body.strip(ASCII_SPACES) and not state[1]:
+            body = _collapse_space(body)
+        return _strip_raw_markup(body + m.group("raw_end"))
+    if m.group("comment") is not None:
+        return _strip_raw_markup(f"<!--{m.group('comment')}-->")
+    if m.group("bogus") is not None:
+        return _strip_raw_markup(f"<!--{m.group('bogus')}-->")
+    # BeautifulSoup writes a newline after the doctype
+    return "\n" if token[:9].lower() == "<!doctype" else ""
 
 def normalize_html(text):
-    # First, preserve link text by unwrapping anchor tags
-    soup = BeautifulSoup(text, 'html.parser')
-    for a in soup.find_all('a'):
-        a.unwrap()
-    text = str(soup)
-    
-    # Then proceed with other normalizations
-    text = re.sub(r"<ul.*?>", "", text)
-    text = re.sub(r"</ul.*?>", "", text)
-    text = re.sub(r"<li.*?>", "• ", text)
-    text = re.sub(r"</li.*?>", "", text)
-    text = re.sub(r"</?(strong|b)>", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"<[^>]+>", "", text)
-    text = re.sub(r"([a-zA-Z])\s*:\s+", r"\1: ", text)
+    # Strips markup in one pass over the tokens: link text is kept, list items
+    # become "• " and text comes out escaped, exactly as the BeautifulSoup
+    # round trip this replaces did. Then tidies "Label :  value" spacing.
+    state = [0, 0]
+    text = HTML_TOKEN_RE.sub(lambda m: _normalize_html_token(m, state), text)
+    text = LABEL_COLON_RE.sub(r"\1: ", text)
     return text.strip()
 
+def normalize_blocks(blocks, markup=False):
+    # Normalizes a list of texts at once. Plain text is joined so the patterns
+    # run once over the whole batch; markup is normalized block by block since
+    # a tag could otherwise run from one block into the next.
+    if markup:
+        return [normalize_html(block) for block in blocks]
+    if any("\0" in block for block in blocks):
+        return [normalize_text(block) for block in blocks]
+    joined = _normalize_whitespace("\0".join(blocks))
+    return [block.strip() for block in joined.split("\0")] if blocks else []
+
 def split_into_blocks(text):
     return [block.strip() for block in text.split("\n\n") if block.strip()]
 
-def block_compare(draft, live, similarity_threshold=0.9):
-    # Split into blocks while preserving paragraph structure
-    draft_blocks = split_into_blocks(draft)
-    live_blocks = split_into_blocks(live)
+def split_into_sentences(block):
+    return [s.strip() for s in block.split('.') if s.strip()]
+
+PARTIAL_MATCH_THRESHOLD = 0.8
+SCORE_CHUNK_ROWS = 256  # draft blocks per matrix product when a scorer scores in bulk
+SCORE_CHUNK_WORDS = 2048  # distinct words per matrix product, which bounds the term matrices
+
+ALIGNMENT_METHODS = ("greedy", "optimal")
+
+WORD_RE = re.compile(r"\w+")
+
+# Counters for the current process; compare_document reads them per document
+STATS = Counter()
+
+def length_bound(a, b):
+    # Same value as SequenceMatcher.real_quick_ratio(), without building a matcher
+    total = len(a) + len(b)
+    return 2.0 * min(len(a), len(b)) / total if total else 1.0
+
+def common_count(a, b):
+    # Size of the multiset intersection of two Counters, i.e. the matches
+    # SequenceMatcher.quick_ratio() counts
+    if len(a) > len(b):
+        a, b = b, a
+    get = b.get
+    total = 0
+    for key, count in a.items():
+        other = get(key, 0)
+        total += count if count < other else other
+    return total
+
+class RatioScorer:
+    # SequenceMatcher.ratio(), the default. Each block or sentence is indexed
+    # once per document: a matcher is kept per second-argument text so its b2j
+    # index is built once, and character counts give the quick_ratio() bound
+    # without building a matcher at all.
+    name = "ratio"
+
+    def __init__(self):
+        self.matchers = {}
+        self.counts = {}
+
+    def _counts(self, text):
+        counts = self.counts.get(text)
+        if counts is None:
+            counts = self.counts[text] = Counter(text)
+        return counts
+
+    def bound(self, a, b):
+        if length_bound(a, b) == 0:
+            return 0.0
+        return 2.0 * common_count(self._counts(a), self._counts(b)) / (len(a) + len(b))
+
+    def length_range(self, text, threshold):
+        # Lengths a block needs to reach threshold against text at all
+        if threshold <= 0:
+            return None
+        return math.floor(len(text) * threshold / (2 - threshold)), math.ceil(len(text) * (2 - threshold) / threshold)
+
+    def score(self, a, b):
+        matcher = self.matchers.get(b)
+        if matcher is None:
+            matcher = self.matchers[b] = difflib.SequenceMatcher(None, "", b)
+        matcher.set_seq1(a)
+        STATS["ratio_calls"] += 1
+        return matcher.ratio()
+
+class JaccardScorer:
+    # Jaccard similarity of the word sets, a fast mode for large pages
+    name = "jaccard"
+
+    def __init__(self):
+        self.tokens = {}
+
+    def _tokens(self, text):
+        tokens = self.tokens.get(text)
+        if tokens is None:
+            tokens = self.tokens[text] = frozenset(WORD_RE.findall(text.lower()))
+        return tokens
+
+    def bound(self, a, b):
+        size_a, size_b = len(self._tokens(a)), len(self._tokens(b))
+        return min(size_a, size_b) / max(size_a, size_b) if size_a and size_b else float(a == b)
+
+    def length_range(self, text, threshold):
+        return None
+
+    def score(self, a, b):
+        tokens_a, tokens_b = self._tokens(a), self._tokens(b)
+        if not tokens_a or not tokens_b:
+            return float(a == b)
+        common = len(tokens_a & tokens_b)
+        return common / (len(tokens_a) + len(tokens_b) - common)
+
+class CosineScorer:
+    # Cosine similarity of word-count vectors. candidate_pairs shortlists whole
+    # block lists at once with NumPy matrix products when NumPy is installed.
+    name = "cosine"
+
+    def __init__(self):
+        self.vectors = {}
+
+    def _vector(self, text):
+        vector = self.vectors.get(text)
+        if vector is None:
+            counts = Counter(WORD_RE.findall(text.lower()))
+            vector = self.vectors[text] = (counts, math.sqrt(sum(c * c for c in counts.values())))
+        return vector
+
+    def bound(self, a, b):
+        return 1.0
+
+    def length_range(self, text, threshold):
+        return None
+
+    def score(self, a, b):
+        (counts_a, norm_a), (counts_b, norm_b) = self._vector(a), self._vector(b)
+        if not norm_a or not norm_b:
+            return float(a == b)
+        if len(counts_a) > len(counts_b):
+            counts_a, counts_b = counts_b, counts_a
+        dot = sum(count * counts_b.get(word, 0) for word, count in counts_a.items())
+        return min(1.0, dot / (norm_a * norm_b))
+
+    def candidate_pairs(self, rows, cols, threshold):
+        # (i, j) for every pair that may reach threshold, in row order, or None
+        # without NumPy. Scores come from float32 matrix products over chunks of
+        # rows, cut at SCORE_CHUNK_ROWS rows or SCORE_CHUNK_WORDS distinct words
+        # so that neither the score matrix nor the term matrices are ever held
+        # whole. Callers rescore each pair exactly.
+        try:
+            import numpy as np  # imported on first use; it is slow to load
+        except ImportError:  # optional: only speeds up the cosine scorer
+            return None
+        return self._shortlist(np, rows, cols, threshold)
+
+    def _shortlist(self, np, rows, cols, threshold):
+        # Every (block, word, weight) of the live side, in flat arrays
+        vocabulary = {}
+        live_blocks, live_words, live_weights = array("i"), array("i"), array("f")
+        for j, text in enumerate(cols):
+            counts, norm = self._vector(text)
+            for word, count in counts.items():
+                live_blocks.append(j)
+                live_words.append(vocabulary.setdefault(word, len(vocabulary)))
+                live_weights.append(count / norm)
+        live_blocks, live_words, live_weights = np.array(live_blocks), np.array(live_words), np.array(live_weights)
+        local = np.full(max(1, len(vocabulary)), -1)
+
+        def chunks():
+            # (start, end, {word id: column}) for runs of rows; words found
+            # only in the draft can't add to a dot product and are left out
+            start, words = 0, {}
+            for i, text in enumerate(rows):
+                row_words = [vocabulary[word] for word in self._vector(text)[0] if word in vocabulary]
+                new = sum(1 for word in row_words if word not in words)
+                if i > start and (i - start == SCORE_CHUNK_ROWS or len(words) + new > SCORE_CHUNK_WORDS):
+                    yield start, i, words
+                    start, words = i, {}
+                for word in row_words:
+                    words.setdefault(word, len(words))
+            yield start, len(rows), words
+
+        for start, end, words in chunks():
+            draft = np.zeros((end - start, max(1, len(words))), dtype=np.float32)
+            for i in range(start, end):
+                counts, norm = self._vector(rows[i])
+                for word, count in counts.items():
+                    if word in vocabulary:
+                        draft[i - start, words[vocabulary[word]]] = count / norm
+            ids = np.fromiter(words, dtype=local.dtype, count=len(words))
+            local[ids] = np.arange(len(ids))
+            columns = local[live_words]
+            keep = columns >= 0
+            live = np.zeros((len(cols), draft.shape[1]), dtype=np.float32)
+            live[live_blocks[keep], columns[keep]] = live_weights[keep]
+            local[ids] = -1
+            # float32 rounding stays far below this margin
+            for i, j in zip(*np.nonzero(draft @ live.T >= threshold - 1e-4)):
+                yield start + int(i), int(j)
+
+SCORERS = {scorer.name: scorer for scorer in (RatioScorer, JaccardScorer, CosineScorer)}
+
+class BlockTable:
+    # The distinct block texts of one comparison, each stored once and known by
+    # its position. Identical draft and live blocks share a single string.
+    __slots__ = ("texts", "ids")
+
+    def __init__(self):
+        self.texts = [""]
+        self.ids = {"": 0}
+
+    def intern(self, text):
+        block_id = self.ids.get(text)
+        if block_id is None:
+            block_id = self.ids[text] = len(self.texts)
+            self.texts.append(text)
+        return block_id
+
+    def share(self, blocks):
+        # blocks with each text replaced by the table's copy
+        return [self.texts[self.intern(block)] for block in blocks]
+
+ALIGNMENT_TAGS = ("matched", "missing", "current")
+
+class Alignment:
+    # block_compare's result: a tag code and the draft and live block ids of
+    # each row, in typed arrays over the comparison's BlockTable. Iterating, or
+    # indexing, gives the (tag, draft, live) tuples; a missing side is "".
+    __slots__ = ("table", "tags", "drafts", "lives")
+
+    def __init__(self, table):
+        self.table = table
+        self.tags = bytearray()
+        self.drafts = array("i")
+        self.lives = array("i")
+
+    def add(self, tag, draft, live):
+        self.tags.append(ALIGNMENT_TAGS.index(tag))
+        self.drafts.append(self.table.intern(draft))
+        self.lives.append(self.table.intern(live))
+
+    def count(self, tag):
+        return self.tags.count(ALIGNMENT_TAGS.index(tag))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, index):
+        texts = self.table.texts
+        return ALIGNMENT_TAGS[self.tags[index]], texts[self.drafts[index]], texts[self.lives[index]]
+
+    def __iter__(self):
+        texts = self.table.texts
+        for tag, draft, live in zip(self.tags, self.drafts, self.lives):
+            yield ALIGNMENT_TAGS[tag], texts[draft], texts[live]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+class ScoreMatrix:
+    # The block pairs scoring at least the threshold, as parallel typed arrays
+    # of draft index, live index and score in (draft, live) order. Iterating
+    # gives (i, j, score) tuples.
+    __slots__ = ("rows", "cols", "scores")
+
+    def __init__(self):
+        self.rows = array("i")
+        self.cols = array("i")
+        self.scores = array("d")
+
+    def add(self, i, j, score):
+        self.rows.append(i)
+        self.cols.append(j)
+        self.scores.append(score)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return zip(self.rows, self.cols, self.scores)
+
+def best_block_match(db, live_positions, matched_live, scorer):
+    # Returns the same (block, score) as scoring every unmatched live block in
+    # order, but prunes candidates that cannot beat the current best.
+    # live_positions maps each distinct live block to its first position.
+    if db in live_positions and db not in matched_live:
+        # An identical block always scores 1.0, which nothing can beat
+        return db, 1.0
+    candidates = sorted(
+        (-scorer.bound(db, lb), j, lb)
+        for lb, j in live_positions.items()
+        if lb not in matched_live
+    )
+    best_match = None
+    best_index = None
+    best_score = 0
+
+    def beats(score, j):
+        # Ties go to the earliest live block, as in a plain in-order scan
+        return score > best_score or (score == best_score and best_index is not None and j < best_index)
+
+    for neg_bound, j, lb in candidates:
+        if -neg_bound < best_score:
+            break
+        if not beats(-neg_bound, j):
+            continue
+        score = scorer.score(db, lb)
+        if beats(score, j):
+            best_match, best_index, best_score = lb, j, score
+    return best_match, best_score
+
+def partial_sentence_matches(draft_sentences, live_sentences, scorer):
+    matches = []
+    # Check if any sentences match
+    for ds in draft_sentences:
+        for ls in live_sentences:
+            if scorer.bound(ds, ls) <= PARTIAL_MATCH_THRESHOLD:
+                continue
+            match_score = scorer.score(ds, ls)
+            if match_score > PARTIAL_MATCH_THRESHOLD:  # Lower threshold for partial matches
+                matches.append((ds, ls, match_score))
+    return matches
+
+def block_compare(draft, live, similarity_threshold=0.9, method="greedy", scorer="ratio"):
+    # method "greedy" gives each draft block, in order, its best unmatched live
+    # block; "optimal" finds the order-preserving alignment with the most
+    # matched content. Both return an Alignment of (tag, draft, live) rows.
+    # scorer picks the block similarity from SCORERS; "jaccard" and "cosine"
+    # are much faster on large pages than the default character "ratio".
+    if method not in ALIGNMENT_METHODS:
+        raise ValueError(f"Unknown alignment method: {method}")
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer: {scorer}")
+    scorer = SCORERS[scorer]()
+
+    # Split into blocks while preserving paragraph structure; each distinct
+    # block is kept once for both sides
+    table = BlockTable()
+    draft_blocks = table.share(split_into_blocks(draft))
+    live_blocks = table.share(split_into_blocks(live))
+    aligned = Alignment(table)
+    STATS["draft_blocks"] += len(draft_blocks)
+    STATS["live_blocks"] += len(live_blocks)
     
     # Find the first H1 in both draft and live content
     draft_h1_index = next((i for i, block in enumerate(draft_blocks) if block.startswith('<h1>')), -1)
@@ -282,155 +1407,1380 @@ def block_compare(draft, live, similarity_threshold=0.9):
     
     # If we found H1s in both, align them
     if draft_h1_index != -1 and live_h1_index != -1:
-        # Create aligned blocks with proper spacing
-        aligned = []
-        
         # Add draft blocks before H1 as unmatched
         for i in range(draft_h1_index):
-            aligned.append(("missing", draft_blocks[i], ""))
+            aligned.add("missing", draft_blocks[i], "")
         
         # Add live blocks before H1 as current
         for i in range(live_h1_index):
-            aligned.append(("current", "", live_blocks[i]))
+            aligned.add("current", "", live_blocks[i])
         
         # Now match the remaining blocks starting from H1
         draft_blocks = draft_blocks[draft_h1_index:]
         live_blocks = live_blocks[live_h1_index:]
+
+    align = _align_optimal if method == "optimal" else _align_greedy
+    matched_content_length += align(draft_blocks, live_blocks, similarity_threshold, aligned, scorer)
+
+    # Calculate the weighted similarity score with more emphasis on matched content
+    if total_draft_length == 0 or total_live_length == 0:
+        similarity = 0.0
+    else:
+        # Calculate individual similarities
+        draft_similarity = matched_content_length / total_draft_length
+        live_similarity = matched_content_length / total_live_length
+        
+        # Use the higher similarity score to give more weight to matched content
+        # Also consider the ratio of matched blocks to total blocks
+        matched_blocks = aligned.count("matched")
+        total_blocks = len(aligned)
+        block_similarity = matched_blocks / total_blocks if total_blocks > 0 else 0
+        
+        # Combine the content similarity and block similarity
+        similarity = max(draft_similarity, live_similarity) * 0.7 + block_similarity * 0.3
     
+    # Return both the alignment results and the calculated similarity score
+    return aligned, similarity
+
+def _align_greedy(draft_blocks, live_blocks, similarity_threshold, aligned, scorer):
+    # Appends the greedy alignment to aligned and returns the matched content length
+    matched_content_length = 0
+
     # First pass: try to match complete paragraphs
     matched_live = set()
-    if 'aligned' not in locals():
-        aligned = []
     
+    # Index the live side once: first position of each distinct block and its sentences
+    live_positions = {}
+    for j, lb in enumerate(live_blocks):
+        live_positions.setdefault(lb, j)
+    live_sentences = {lb: split_into_sentences(lb) for lb in live_positions}
+
     for db in draft_blocks:
-        best_match = None
-        best_score = 0
-        
         # Try to find the best matching block
-        for lb in live_blocks:
-            if lb in matched_live:
-                continue
-            score = difflib.SequenceMatcher(None, db, lb).ratio()
-            if score > best_score:
-                best_score = score
-                best_match = lb
+        best_match, best_score = best_block_match(db, live_positions, matched_live, scorer)
         
         # If we have a good match, use it
         if best_score >= similarity_threshold:
             matched_live.add(best_match)
-            aligned.append(("matched", db, best_match))
+            aligned.add("matched", db, best_match)
             # Add the matched content length weighted by the match score
             matched_content_length += len(db) * best_score
         else:
             # If no good match, try to find partial matches
             partial_matches = []
             partial_match_length = 0
+            draft_sentences = split_into_sentences(db)
+            sentence_matches = {}
             for lb in live_blocks:
                 if lb in matched_live:
                     continue
-                # Split the live block into sentences
-                live_sentences = [s.strip() for s in lb.split('.') if s.strip()]
-                draft_sentences = [s.strip() for s in db.split('.') if s.strip()]
-                
-                # Check if any sentences match
-                for ds in draft_sentences:
-                    for ls in live_sentences:
-                        match_score = difflib.SequenceMatcher(None, ds, ls).ratio()
-                        if match_score > 0.8:  # Lower threshold for partial matches
-                            partial_matches.append((ds, ls))
-                            partial_match_length += len(ds) * match_score
+                # Duplicate live blocks repeat the same sentence matches
+                if lb not in sentence_matches:
+                    sentence_matches[lb] = partial_sentence_matches(draft_sentences, live_sentences[lb], scorer)
+                for ds, ls, match_score in sentence_matches[lb]:
+                    partial_matches.append((ds, ls))
+                    partial_match_length += len(ds) * match_score
             
             if partial_matches:
                 # Combine partial matches into a single block
                 combined_live = " ".join(m[1] for m in partial_matches)
                 matched_live.add(combined_live)
-                aligned.append(("matched", db, combined_live))
+                aligned.add("matched", db, combined_live)
                 matched_content_length += partial_match_length
             else:
-                aligned.append(("missing", db, best_match if best_match else ""))
+                aligned.add("missing", db, best_match if best_match else "")
 
     # Add any unmatched live blocks
     for lb in live_blocks:
         if lb not in matched_live:
-            aligned.append(("current", "", lb))
+            aligned.add("current", "", lb)
 
-    # Calculate the weighted similarity score with more emphasis on matched content
-    if total_draft_length == 0 or total_live_length == 0:
-        similarity = 0.0
-    else:
-        # Calculate individual similarities
-        draft_similarity = matched_content_length / total_draft_length
-        live_similarity = matched_content_length / total_live_length
-        
-        # Use the higher similarity score to give more weight to matched content
-        # Also consider the ratio of matched blocks to total blocks
-        matched_blocks = sum(1 for tag, _, _ in aligned if tag == "matched")
-        total_blocks = len(aligned)
-        block_similarity = matched_blocks / total_blocks if total_blocks > 0 else 0
-        
-        # Combine the content similarity and block similarity
-        similarity = max(draft_similarity, live_similarity) * 0.7 + block_similarity * 0.3
-    
-    # Return both the alignment results and the calculated similarity score
-    return aligned, similarity
+    return matched_content_length
 
-def format_result_as_html(docx_file, url, title, meta_desc, similarity, results):
-    report = f"<h2>{docx_file} vs <a href='{url}'>{url}</a></h2>"
-    report += f"<p><strong>Page Title:</strong> {title}</p>"
-    report += f"<p><strong>Meta Description:</strong> {meta_desc}</p>"
-    report += f"<p><strong>Similarity Score:</strong> {similarity:.2%}</p>"
-    report += "<div style='display: flex; gap: 20px;'>"
-    
-    # Draft column
-    report += "<div style='width: 50%;'><h3>Draft</h3><div style='white-space: pre-wrap;'>"
-    for tag, draft, live in results:
-        if tag in ['matched', 'missing']:
-            report += f"<div style='background:{'#e6ffe6' if tag == 'matched' else '#ffe6e6'}; margin-bottom: 10px; padding: 10px;'>{draft}</div>"
-        else:  # tag == 'current'
-            # Create an invisible div with the same content to maintain spacing
-            report += f"<div style='visibility: hidden; margin-bottom: 10px; padding: 10px;'>{live}</div>"
-    report += "</div></div>"
-    
-    # Live column
-    report += "<div style='width: 50%;'><h3>Live Webpage</h3><div style='white-space: pre-wrap;'>"
+def candidate_scores(draft_blocks, live_blocks, threshold, scorer):
+    # Sparse similarity matrix: a ScoreMatrix of every block pair scoring at
+    # least threshold. Scorers with candidate_pairs shortlist the pairs in bulk;
+    # otherwise only live blocks whose length allows the threshold are looked
+    # at, found by bisecting the live blocks sorted by length.
+    scores = ScoreMatrix()
+    pairs = scorer.candidate_pairs(draft_blocks, live_blocks, threshold) if hasattr(scorer, "candidate_pairs") and draft_blocks and live_blocks else None
+    if pairs is not None:
+        # The shortlist is rescored so the result is identical to the pure
+        # Python path despite floating point rounding
+        for i, j in pairs:
+            score = 1.0 if draft_blocks[i] == live_blocks[j] else scorer.score(draft_blocks[i], live_blocks[j])
+            if score >= threshold:
+                scores.add(i, j, score)
+        return scores
+    order = sorted(range(len(live_blocks)), key=lambda j: len(live_blocks[j]))
+    lengths = [len(live_blocks[j]) for j in order]
+    for i, db in enumerate(draft_blocks):
+        window = scorer.length_range(db, threshold)
+        if window:
+            lo, hi = bisect.bisect_left(lengths, window[0]), bisect.bisect_right(lengths, window[1])
+        else:
+            lo, hi = 0, len(order)
+        row = []
+        for j in order[lo:hi]:
+            lb = live_blocks[j]
+            if db == lb:
+                row.append((j, 1.0))
+                continue
+            if scorer.bound(db, lb) < threshold:
+                continue
+            score = scorer.score(db, lb)
+            if score >= threshold:
+                row.append((j, score))
+        for j, score in sorted(row):
+            scores.add(i, j, score)
+    return scores
+
+def _best_chain(scores, draft_blocks, live_size):
+    # Heaviest chain of pairs increasing in both i and j, weighting each pair by
+    # its matched content (draft length x score). A Fenwick tree over live
+    # positions answers "best chain ending before j" in O(log M). Pairs are
+    # known by their position in scores, which is already in (i, j) order.
+    tree_value = [0.0] * (live_size + 1)
+    tree_node = [-1] * (live_size + 1)
+    rows, cols, values = scores.rows, scores.cols, scores.scores
+    previous = array("i", [-1]) * len(rows)  # the pair each pair's best chain continues
+    best_value, best_node = 0.0, -1
+    start = 0
+    while start < len(rows):
+        # Pairs in the same draft row can't chain to each other: query them all first
+        end = start
+        while end < len(rows) and rows[end] == rows[start]:
+            end += 1
+        weight = len(draft_blocks[rows[start]])
+        row = []
+        for node in range(start, end):
+            value, k = 0.0, cols[node]
+            while k > 0:
+                if tree_value[k] > value:
+                    value, previous[node] = tree_value[k], tree_node[k]
+                k -= k & -k
+            row.append((cols[node], value + weight * values[node], node))
+        for j, value, node in row:
+            if value > best_value:
+                best_value, best_node = value, node
+            k = j + 1
+            while k <= live_size:
+                if value > tree_value[k]:
+                    tree_value[k], tree_node[k] = value, node
+                k += k & -k
+        start = end
+    chain = []
+    while best_node != -1:
+        chain.append((rows[best_node], cols[best_node], values[best_node]))
+        best_node = previous[best_node]
+    return chain[::-1]
+
+def _align_optimal(draft_blocks, live_blocks, similarity_threshold, aligned, scorer):
+    # Appends the order-preserving alignment with the most matched content to
+    # aligned and returns the matched content length. Unmatched draft blocks get
+    # the same partial sentence matching as the greedy engine, but only against
+    # the live blocks between the same two matches.
+    matched_content_length = 0
+    scores = candidate_scores(draft_blocks, live_blocks, similarity_threshold, scorer)
+    chain = _best_chain(scores, draft_blocks, len(live_blocks))
+    live_sentences = {}
+    prev_i = prev_j = 0
+    for i, j, score in chain + [(len(draft_blocks), len(live_blocks), None)]:
+        gap_live = live_blocks[prev_j:j]
+        for db in draft_blocks[prev_i:i]:
+            partial_matches = []
+            partial_match_length = 0
+            draft_sentences = split_into_sentences(db)
+            for lb in gap_live:
+                if lb not in live_sentences:
+                    live_sentences[lb] = split_into_sentences(lb)
+                for ds, ls, match_score in partial_sentence_matches(draft_sentences, live_sentences[lb], scorer):
+                    partial_matches.append((ds, ls))
+                    partial_match_length += len(ds) * match_score
+            if partial_matches:
+                aligned.add("matched", db, " ".join(m[1] for m in partial_matches))
+                matched_content_length += partial_match_length
+            else:
+                aligned.add("missing", db, "")
+        for lb in gap_live:
+            aligned.add("current", "", lb)
+        if score is not None:
+            aligned.add("matched", draft_blocks[i], live_blocks[j])
+            matched_content_length += len(draft_blocks[i]) * score
+        prev_i, prev_j = i + 1, j + 1
+    return matched_content_length
+
+DASHBOARD_FILE = "dashboard.html"
+DIFF_DIR = "diffs"
+FILE_SLUG_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+def diff_file_name(index, docx_file):
+    # "3_Service-Page.js": the row number keeps names unique, and the rest of
+    # the DOCX name is reduced to characters that are safe in a script URL
+    name = FILE_SLUG_RE.sub("-", os.path.splitext(os.path.basename(docx_file))[0]).strip("-")
+    return f"{index + 1}_{name}.js"
+
+def diff_url(diff_path):
+    # The diff script's path relative to the dashboard, as the row and the
+    # script itself name it
+    return f"{DIFF_DIR}/{quote(os.path.basename(diff_path))}"
+
+def diff_rows(results):
+    # Alignment tuples in the compact form the dashboard reads. A matched pair
+    # whose texts are identical carries the text once; missing and current rows
+    # carry only their own side.
+    rows = []
     for tag, draft, live in results:
-        if tag in ['matched', 'current']:
-            report += f"<div style='background:{'#e6ffe6' if tag == 'matched' else '#e6f0ff'}; margin-bottom: 10px; padding: 10px;'>{live}</div>"
-        else:  # tag == 'missing'
-            # Create an invisible div with the same content to maintain spacing
-            report += f"<div style='visibility: hidden; margin-bottom: 10px; padding: 10px;'>{draft}</div>"
-    report += "</div></div>"
-    
-    report += "</div><hr>"
-    return report
+        if tag == "matched":
+            rows.append(["m", draft] if draft == live else ["m", draft, live])
+        elif tag == "missing":
+            rows.append(["x", draft])
+        else:
+            rows.append(["c", live])
+    return rows
 
-def format_result_as_markdown(docx_file, url, title, meta_desc, similarity, results):
-    report = f"## {docx_file} vs {url}\n"
-    report += f"**Page Title**: {title}\n\n"
-    report += f"**Meta Description**: {meta_desc}\n\n"
-    report += f"**Similarity Score**: `{similarity:.2%}`\n\n"
+def write_diff_script(out, name, docx_file, url, title, meta_desc, similarity, results):
+    # One document's diff, loaded by the dashboard when the document is opened.
+    # It's a script rather than JSON because pages opened from file:// can't
+    # fetch() their neighbours.
+    data = {"docx": docx_file, "url": url, "title": title, "meta": meta_desc, "similarity": similarity, "rows": diff_rows(results)}
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    out.write(f"showDiff({json.dumps(name)},{payload});\n")
+
+def write_result_markdown(out, docx_file, url, title, meta_desc, similarity, results):
+    out.write(f"## {docx_file} vs {url}\n")
+    out.write(f"**Page Title**: {title}\n\n")
+    out.write(f"**Meta Description**: {meta_desc}\n\n")
+    out.write(f"**Similarity Score**: `{similarity:.2%}`\n\n")
     if similarity > 0.95:
-        report += "✅ Content is mostly identical.\n\n"
+        out.write("✅ Content is mostly identical.\n\n")
     elif similarity > 0.75:
-        report += "⚠️ Content has minor differences.\n\n"
+        out.write("⚠️ Content has minor differences.\n\n")
     else:
-        report += "❌ Content is significantly different.\n\n"
-    report += "### Differences\n"
+        out.write("❌ Content is significantly different.\n\n")
+    out.write("### Differences\n")
     for tag, draft, live in results:
         if tag == "matched":
-            report += f"✅ MATCHED: {draft}\n"
+            out.write(f"✅ MATCHED: {draft}\n")
         elif tag == "missing":
-            report += f"🟥 MISSING: {draft}\n"
+            out.write(f"🟥 MISSING: {draft}\n")
             if live:
-                report += f"🟩 CURRENT: {live}\n"
+                out.write(f"🟩 CURRENT: {live}\n")
         elif tag == "current":
-            report += f"🟩 CURRENT: {live}\n"
-    report += "\n"
-    return report
+            out.write(f"🟩 CURRENT: {live}\n")
+    out.write("\n")
+
+def format_result_as_markdown(docx_file, url, title, meta_desc, similarity, results):
+    out = io.StringIO()
+    write_result_markdown(out, docx_file, url, title, meta_desc, similarity, results)
+    return out.getvalue()
+
+# The dashboard's head: styles plus the script that sorts the index and loads
+# each diff from diffs/ when its row is clicked. Rows are streamed in after it.
+DASHBOARD_HEAD = """<!DOCTYPE html>
+<html><head><meta charset='UTF-8'><title>Batch Comparison Dashboard</title>
+<style>
+body { font-family: sans-serif; margin: 20px; }
+#docs { border-collapse: collapse; width: 100%; }
+#docs th, #docs td { border: 1px solid #ccc; padding: 4px 8px; text-align: left; }
+#docs th { background: #f0f0f0; cursor: pointer; position: sticky; top: 0; }
+#docs th.asc::after { content: " \\25b2"; }
+#docs th.desc::after { content: " \\25bc"; }
+#docs tbody tr { cursor: pointer; }
+#docs tbody tr:hover { background: #f7f7f7; }
+#docs tr.selected { background: #fff6d5; }
+#docs td.num { text-align: right; }
+#docs tr.error td { color: #a00; }
+.grid { display: grid; grid-template-columns: 1fr 1fr; gap: 10px 20px; }
+.grid > div { white-space: pre-wrap; padding: 10px; }
+.grid h1, .grid h2, .grid h3, .grid h4, .grid h5, .grid h6 { margin: 0; }
+.matched { background: #e6ffe6; }
+.missing { background: #ffe6e6; }
+.current { background: #e6f0ff; }
+</style>
+<script>
+var loaded = {}, current = null;
+
+function showDiff(name, data) {
+  // Called by each diffs/*.js file once it has loaded
+  loaded[name] = data;
+  if (current === name) render(data);
+}
+
+function element(tag, text, className) {
+  var node = document.createElement(tag);
+  node.textContent = text;
+  if (className) node.className = className;
+  return node;
+}
+
+function block(text, className) {
+  // Blocks are plain text, apart from the heading markers the extraction adds
+  var heading = /^<h([1-6])>([\\s\\S]*)<\\/h\\1>$/.exec(text);
+  var cell = element("div", heading ? "" : text, text ? className : "");
+  if (heading) cell.appendChild(element("h" + heading[1], heading[2]));
+  return cell;
+}
+
+function render(data) {
+  var panel = document.getElementById("diff"), grid = element("div", "", "grid");
+  panel.textContent = "";
+  var title = element("h2", data.docx + " vs ");
+  var link = element("a", data.url);
+  link.href = data.url;
+  title.appendChild(link);
+  panel.append(title, element("p", "Page Title: " + data.title), element("p", "Meta Description: " + data.meta),
+               element("p", "Similarity Score: " + (data.similarity * 100).toFixed(2) + "%"));
+  grid.append(element("h3", "Draft"), element("h3", "Live Webpage"));
+  data.rows.forEach(function (row) {
+    if (row[0] === "m") grid.append(block(row[1], "matched"), block(row.length > 2 ? row[2] : row[1], "matched"));
+    else if (row[0] === "x") grid.append(block(row[1], "missing"), block("", ""));
+    else grid.append(block("", ""), block(row[1], "current"));
+  });
+  panel.appendChild(grid);
+}
+
+function openRow(row) {
+  var panel = document.getElementById("diff"), name = row.dataset.diff;
+  document.querySelectorAll("#docs tr.selected").forEach(function (r) { r.classList.remove("selected"); });
+  row.classList.add("selected");
+  history.replaceState(null, "", "#" + row.id);
+  current = name;
+  if (!name) {
+    panel.textContent = row.dataset.error || "No diff for this document.";
+  } else if (loaded[name]) {
+    render(loaded[name]);
+  } else {
+    panel.textContent = "Loading...";
+    var script = document.createElement("script");
+    script.src = name;
+    script.charset = "utf-8";
+    script.onerror = function () { if (current === name) panel.textContent = "Could not load " + name; };
+    document.head.appendChild(script);
+  }
+  panel.scrollIntoView();
+}
+
+function sortBy(th) {
+  var tbody = document.querySelector("#docs tbody"), column = th.cellIndex, ascending = !th.classList.contains("asc");
+  var key = function (row) {
+    var cell = row.cells[column];
+    return cell.dataset.sort !== undefined ? parseFloat(cell.dataset.sort) : cell.textContent.toLowerCase();
+  };
+  document.querySelectorAll("#docs th").forEach(function (h) { h.classList.remove("asc", "desc"); });
+  th.classList.add(ascending ? "asc" : "desc");
+  Array.from(tbody.rows).sort(function (a, b) {
+    var x = key(a), y = key(b);
+    return (x < y ? -1 : x > y ? 1 : 0) * (ascending ? 1 : -1);
+  }).forEach(function (row) { tbody.appendChild(row); });
+}
+
+document.addEventListener("DOMContentLoaded", function () {
+  document.querySelectorAll("#docs th").forEach(function (th) { th.onclick = function () { sortBy(th); }; });
+  document.querySelector("#docs tbody").onclick = function (event) {
+    var row = event.target.closest("tr");
+    if (row && !event.target.closest("a")) openRow(row);
+  };
+  sortBy(document.querySelector("#docs th"));  // rows arrive in the order documents finished
+  var linked = location.hash && document.getElementById(location.hash.slice(1));
+  if (linked) openRow(linked);
+});
+</script>
+</head><body>
+<h1>Batch Comparison Dashboard</h1>
+<table id='docs'><thead><tr><th>#</th><th>Draft</th><th>Live Page</th><th>Similarity</th><th>Status</th>
+<th>Fetch (s)</th><th>Compare (s)</th><th>Total (s)</th></tr></thead><tbody>
+"""
+
+MARKDOWN_HEAD = b"# Batch Comparison Report\n\n"
+
+class BatchReportWriter:
+    # Streams comparison_report.md and, with dashboard, a dashboard.html
+    # indexing every document. Each document's diff lives in its own script
+    # under diffs/, written by the worker that compared it. Results may arrive
+    # in any order; each is written as soon as it arrives and files are
+    # flushed after each one, so nothing waits on a slow document and a
+    # crashed run still leaves every finished document on disk. close() puts
+    # the markdown sections back in document order; the dashboard sorts its
+    # rows when opened.
+
+    def __init__(self, output_dir, dashboard=True):
+        self.md_path = os.path.join(output_dir, "comparison_report.md")
+        self.dashboard_path = os.path.join(output_dir, DASHBOARD_FILE) if dashboard else None
+        self.md = open(self.md_path, "w+b")
+        self.dashboard = open(self.dashboard_path, "w", encoding="utf-8") if dashboard else None
+        self.sections = []  # (index, byte offset, byte length) of each markdown section
+        self.status = Counter()
+        self.md.write(MARKDOWN_HEAD)
+        if self.dashboard:
+            self.dashboard.write(DASHBOARD_HEAD)
+        self._flush()
+
+    def add(self, index, docx_file, url, result, record):
+        self._write(index, docx_file, url, result, record)
+        self._flush()
+
+    def _write(self, index, docx_file, url, result, record):
+        section = result.markdown.encode("utf-8")
+        self.sections.append((index, self.md.tell(), len(section)))
+        self.md.write(section)
+        self.status[record["status"]] += 1
+        if not self.dashboard:
+            return
+        attributes = f" id='doc-{index + 1}'"
+        if result.diff_path:
+            attributes += f" data-diff='{html.escape(diff_url(result.diff_path))}'"
+        if result.error:
+            attributes += f" class='error' data-error='{html.escape(result.error)}'"
+        similarity = result.similarity if result.similarity is not None else -1
+        self.dashboard.write(
+            f"<tr{attributes}><td data-sort='{index + 1}'>{index + 1}</td><td>{html.escape(docx_file)}</td>"
+            f"<td><a href='{html.escape(url)}'>{html.escape(url)}</a></td>"
+            f"<td class='num' data-sort='{similarity}'>{'' if similarity < 0 else f'{similarity:.2%}'}</td>"
+            f"<td>{record['status']}</td>"
+            + "".join(f"<td class='num' data-sort='{record.get(stage, 0)}'>{record.get(stage, 0):.2f}</td>"
+                      for stage in ("fetch_s", "compare_s", "total_s"))
+            + "</tr>\n"
+        )
+
+    def _flush(self):
+        self.md.flush()
+        if self.dashboard:
+            self.dashboard.flush()
+
+    def close(self, trailer=""):
+        if self.sections == sorted(self.sections):
+            self.md.write(trailer.encode("utf-8"))
+            self.md.close()
+        else:
+            # Copy the sections into document order one at a time, so the
+            # report is never held in memory whole
+            reordered = self.md_path + ".tmp"
+            with open(reordered, "wb") as out:
+                out.write(MARKDOWN_HEAD)
+                for _, offset, length in sorted(self.sections):
+                    self.md.seek(offset)
+                    out.write(self.md.read(length))
+                out.write(trailer.encode("utf-8"))
+            self.md.close()
+            os.replace(reordered, self.md_path)
+        if self.dashboard:
+            counts = " · ".join(f"{status} {count}" for status, count in sorted(self.status.items()))
+            self.dashboard.write(
+                f"</tbody></table><p>{sum(self.status.values())} documents{' · ' + counts if counts else ''}."
+                " Click a column to sort, or a row to show its diff.</p><div id='diff'></div></body></html>"
+            )
+            self.dashboard.close()
+
+# ------------------ URL Matching ------------------
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+SITEMAP_MAX_URLS = 5000
+MATCH_CONFIDENCE = 0.8  # suggestions below this are flagged for review
+AMBIGUITY_MARGIN = 0.1  # a runner-up this close to the best match lowers confidence
+MATCH_CANDIDATES = 10  # pages per document scored in full after the word index lookup
+H1_RE = re.compile(r"<h1>(.*?)</h1>", re.DOTALL)
+
+UrlMatch = namedtuple("UrlMatch", "url confidence")
+
+def fetch_sitemap_urls(url, max_urls=SITEMAP_MAX_URLS):
+    # Page URLs listed in a sitemap, following sitemap indexes. A bare site
+    # URL means its /sitemap.xml.
+    parts = urlsplit(url)
+    if parts.path in ("", "/"):
+        url = f"{parts.scheme}://{parts.netloc}/sitemap.xml"
+    urls = []
+    seen = set()
+    sitemaps = [url]
+    while sitemaps and len(urls) < max_urls:
+        sitemap = sitemaps.pop(0)
+        if sitemap in seen:
+            continue
+        seen.add(sitemap)
+        response = get_session().get(sitemap, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        content = response.content
+        if content[:2] == b"\x1f\x8b":  # .xml.gz served without Content-Encoding
+            content = gzip.decompress(content)
+        root = ET.fromstring(content)
+        locs = [loc.text.strip() for loc in root.iter(SITEMAP_NS + "loc") if loc.text and loc.text.strip()]
+        if root.tag == SITEMAP_NS + "sitemapindex":
+            sitemaps.extend(locs)
+        else:
+            urls.extend(locs)
+    return list(dict.fromkeys(urls))[:max_urls]
+
+def read_url_list(path):
+    # One URL per line; blank lines and # comments are skipped
+    with open(path, encoding="utf-8-sig") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")))
+
+def _match_key(text):
+    return " ".join(WORD_RE.findall(html.unescape(text).lower()))
+
+def _url_slug(url):
+    slug = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    return os.path.splitext(slug)[0].replace("-", " ").replace("_", " ")
+
+def first_h1(text):
+    match = H1_RE.search(text)
+    return match.group(1).strip() if match else ""
+
+class PageIndex:
+    # Word index over each page's H1, title and URL slug. Lookups only score
+    # the pages sharing the most (IDF-weighted) words with the query.
+
+    def __init__(self):
+        self.urls = []
+        self.keys = []
+        self.postings = {}
+
+    def add(self, url, title="", h1=""):
+        page = len(self.urls)
+        keys = {key for key in (_match_key(h1), _match_key(title), _match_key(_url_slug(url))) if key}
+        self.urls.append(url)
+        self.keys.append(keys)
+        for word in {word for key in keys for word in key.split()}:
+            self.postings.setdefault(word, []).append(page)
+
+    def match(self, text):
+        # Best UrlMatch for text, or None if no page shares a word with it
+        key = _match_key(text)
+        weights = Counter()
+        for word in set(key.split()):
+            pages = self.postings.get(word, ())
+            for page in pages:
+                weights[page] += math.log(1 + len(self.urls) / len(pages))
+        scores = sorted(
+            ((max(difflib.SequenceMatcher(None, key, page_key).ratio() for page_key in self.keys[page]), page)
+             for page, _ in weights.most_common(MATCH_CANDIDATES)),
+            key=lambda item: (-item[0], item[1]),
+        )
+        if not scores:
+            return None
+        best, page = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        return UrlMatch(self.urls[page], best * min(1.0, (best - runner_up) / AMBIGUITY_MARGIN))
+
+def build_page_index(urls, fetch_workers=FETCH_WORKERS, on_progress=None):
+    # Fetches every candidate page (through the page cache) and indexes its
+    # title and first H1 as extracted by get_webpage_text
+    urls = list(urls)
+    index = PageIndex()
+    pages = {}
+    for done, (i, (text, title, _), _) in enumerate(fetch_pages(urls, max_workers=fetch_workers), 1):
+        if not text.startswith("[ERROR"):
+            pages[i] = (title, first_h1(text))
+        if on_progress:
+            on_progress(done, len(urls))
+    for i, url in enumerate(urls):
+        if i in pages:
+            index.add(url, *pages[i])
+    return index
+
+def stored_page_index(store_path):
+    # PageIndex over every page in a crawl store, without fetching anything
+    index = PageIndex()
+    store = CrawlStore(store_path, readonly=True)
+    try:
+        for url, title, text in store.pages():
+            index.add(url, title, first_h1(text))
+    finally:
+        store.close()
+    return index
+
+def match_documents(folder, docx_files, index):
+    # Suggests a URL for each DOCX by its first H1 and by its file name,
+    # keeping whichever match is more confident. Returns {docx_file: UrlMatch}.
+    suggestions = {}
+    for docx_file in docx_files:
+        queries = [os.path.splitext(os.path.basename(docx_file))[0].replace("-", " ").replace("_", " ")]
+        try:
+            queries.append(first_h1(get_docx_text(os.path.join(folder, docx_file))))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile, ET.ParseError):
+            pass
+        matches = [match for match in map(index.match, filter(None, queries)) if match]
+        if matches:
+            suggestions[docx_file] = max(matches, key=lambda match: match.confidence)
+    return suggestions
+
+# ------------------ Crawling ------------------
+
+CRAWL_WORKERS = 4
+CRAWL_DELAY = 1.0  # seconds between requests to one host; robots.txt Crawl-delay can raise it
+CRAWL_MAX_PAGES = 50000  # frontier size limit, which also bounds the store
+CRAWL_MAX_DEPTH = 20
+CRAWL_STORE = "crawl.sqlite"
+CRAWL_COMMIT_EVERY = 50  # finished pages between commits; at most this many are refetched after a crash
+TRACKING_PARAM_RE = re.compile(r"utm_\w+|gclid|fbclid|msclkid|_ga", re.IGNORECASE)
+NON_PAGE_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".zip", ".gz", ".doc", ".docx",
+    ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".mov", ".css", ".js", ".json", ".xml", ".txt",
+}
+
+def canonical_url(url):
+    # One spelling per page: lowercase scheme and host, no default port,
+    # fragment or tracking parameters, sorted query, collapsed slashes
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAM_RE.fullmatch(key)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+def _crawlable(url, hosts):
+    parts = urlsplit(url)
+    return (
+        parts.scheme in ("http", "https")
+        and (hosts is None or parts.netloc in hosts)
+        and os.path.splitext(parts.path)[1].lower() not in NON_PAGE_EXTENSIONS
+    )
+
+class CrawlStore:
+    # SQLite frontier and page store for a crawl. The frontier lives on disk,
+    # deduplicated by canonical URL, so memory use doesn't grow with the site;
+    # pages keep only the extracted content. Reopening a store resumes its crawl.
+    # With readonly the store must already exist; a mistyped path raises
+    # sqlite3.Error instead of creating an empty store.
+
+    def __init__(self, path, max_pages=CRAWL_MAX_PAGES, readonly=False):
+        self.lock = threading.Lock()
+        self.max_pages = max_pages
+        self.pending_commits = 0
+        if readonly:
+            try:
+                self.db = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+                self.size = self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            except sqlite3.Error as e:
+                raise sqlite3.OperationalError(f"Can't read crawl store {path}: {e}") from None
+            return
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE, depth INTEGER, state TEXT DEFAULT 'queued');"
+            "CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, seq);"
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, title TEXT, meta_description TEXT, text TEXT, crawled_at REAL);"
+            # Pages being fetched when the last run stopped are fetched again
+            "UPDATE frontier SET state = 'queued' WHERE state = 'fetching';"
+        )
+        self.db.commit()
+        self.size = self.db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+
+    def add(self, urls):
+        # Queues (url, depth) pairs that aren't known yet, up to max_pages
+        with self.lock:
+            for url, depth in urls:
+                if self.size >= self.max_pages:
+                    break
+                self.size += self.db.execute(
+                    "INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)", (url, depth)
+                ).rowcount
+
+    def claim(self, limit):
+        # The next queued (url, depth) pairs in breadth-first order, marked as being fetched
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT seq, url, depth FROM frontier WHERE state = 'queued' ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+            self.db.executemany("UPDATE frontier SET state = 'fetching' WHERE seq = ?", [(seq,) for seq, _, _ in rows])
+        return [(url, depth) for _, url, depth in rows]
+
+    def finish(self, url, state, page=None):
+        with self.lock:
+            self.db.execute("UPDATE frontier SET state = ? WHERE url = ?", (state, url))
+            if page:
+                text, title, meta_description = page
+                self.db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                    (url, title, meta_description, text, time.time()),
+                )
+            self.pending_commits += 1
+            if self.pending_commits >= CRAWL_COMMIT_EVERY:
+                self.db.commit()
+                self.pending_commits = 0
+
+    def page(self, url):
+        # (text, title, meta_description) for a crawled URL, or None
+        with self.lock:
+            row = self.db.execute(
+                "SELECT text, title, meta_description FROM pages WHERE url = ?", (canonical_url(url),)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def pages(self):
+        # Yields (url, title, text) for every crawled page, streamed from disk
+        yield from self.db.execute("SELECT url, title, text FROM pages ORDER BY url")
+
+    def counts(self):
+        with self.lock:
+            return dict(self.db.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+class RobotsRules:
+    # robots.txt for each host, fetched once per crawl. Hosts whose robots.txt
+    # is missing are open; ones that refuse access to it are closed. The first
+    # caller for a host fetches it outside the lock, and later callers for that
+    # host wait on its future, so a slow host never holds up the others.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.parsers = {}  # host -> Future of its RobotFileParser
+
+    def _parser(self, url):
+        parts = urlsplit(url)
+        with self.lock:
+            future = self.parsers.get(parts.netloc)
+            fetch = future is None
+            if fetch:
+                future = self.parsers[parts.netloc] = Future()
+        if fetch:
+            try:
+                future.set_result(self._fetch(parts))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def _fetch(self, parts):
+        parser = RobotFileParser()
+        try:
+            response = get_session().get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=FETCH_TIMEOUT)
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code >= 400:
+                parser.allow_all = True
+            else:
+                parser.parse(response.text.splitlines())
+        except requests.RequestException:
+            parser.allow_all = True
+        return parser
+
+    def allowed(self, url):
+        return self._parser(url).can_fetch(get_session().headers["User-Agent"], url)
+
+    def delay(self, url):
+        return self._parser(url).crawl_delay(get_session().headers["User-Agent"]) or 0
+
+class HostRateLimiter:
+    # Spaces out requests to each host; callers sleep until their turn
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_time = {}
+
+    def wait(self, url, delay):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            turn = max(now, self.next_time.get(host, 0.0))
+            self.next_time[host] = turn + delay
+        if turn > now:
+            time.sleep(turn - now)
+
+def _crawl_one(url, robots, limiter, delay):
+    # Returns (frontier state, page or None, links found)
+    if not robots.allowed(url):
+        return "blocked", None, []
+    limiter.wait(url, max(delay, robots.delay(url)))
+    links = []
+    with _host_slot(url):
+        page = get_webpage_text(url, links=links)
+    if page[0].startswith("[ERROR"):
+        # A fetched page with no content of its own, like a link hub, is
+        # still followed; links is empty if the fetch itself failed
+        return "failed", None, links
+    return "done", page, links
+
+def crawl(seeds, store_path=CRAWL_STORE, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+          workers=CRAWL_WORKERS, delay=CRAWL_DELAY, same_host=True, cancel=None, on_progress=None):
+    # Crawls outward from seeds, breadth first, writing each page's extracted
+    # content to the CrawlStore at store_path. Running it again on the same
+    # store resumes where it stopped. same_host keeps the crawl on the seeds'
+    # hosts. on_progress(counts) gets the frontier state counts as pages finish.
+    # Returns the final counts.
+    cancel = cancel or threading.Event()
+    store = CrawlStore(store_path, max_pages)
+    seeds = [canonical_url(seed) for seed in seeds]
+    hosts = {urlsplit(seed).netloc for seed in seeds} if same_host else None
+    store.add((seed, 0) for seed in seeds)
+    robots = RobotsRules()
+    limiter = HostRateLimiter()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    in_flight = {}
+    try:
+        while not cancel.is_set():
+            # Only a couple of batches are ever in memory; the rest waits on disk
+            for url, depth in store.claim(2 * workers - len(in_flight)):
+                in_flight[executor.submit(_crawl_one, url, robots, limiter, delay)] = (url, depth)
+            if not in_flight:
+                break
+            finished, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in finished:
+                url, depth = in_flight.pop(future)
+                try:
+                    state, page, links = future.result()
+                except Exception:
+                    state, page, links = "failed", None, []
+                store.finish(url, state, page)
+                if links and depth < max_depth:
+                    store.add((link, depth + 1) for link in dict.fromkeys(map(canonical_url, links)) if _crawlable(link, hosts))
+            if finished and on_progress:
+                on_progress(store.counts())
+        return store.counts()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        store.close()
+
+def stored_pages(store, urls):
+    # Same (index, page, metrics) stream as fetch_pages, read from an open CrawlStore
+    for index, url in enumerate(urls):
+        page = store.page(url)
+        yield index, page or ("[ERROR: Page not in crawl store]", "Untitled Page", ""), {"cache": "store"}
 
 # ------------------ Main Comparison Logic ------------------
 
+COMPARE_WORKERS = os.cpu_count() or 1
+STATE_FILE = ".comparison_state.sqlite"
+
+# markdown is None when the draft and page are unchanged since the stored run;
+# diff_path is the dashboard script holding the diff; metrics holds per-stage
+# timings and counters from the worker; error is set when the pair failed
+DocumentResult = namedtuple("DocumentResult", "markdown summary diff_path draft_hash similarity metrics error", defaults=(None, None))
+
+# How run_batch compares and reports: see run_batch for each option
+BatchOptions = namedtuple(
+    "BatchOptions",
+    "output_dir compare_workers fetch_workers write_html incremental profile method scorer crawl_store",
+    defaults=(None, COMPARE_WORKERS, FETCH_WORKERS, True, True, False, "greedy", "ratio", None),
+)
+
+def content_hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class RunState:
+    # SQLite record of the last result for each docx/URL pair in a batch folder,
+    # so pairs whose draft and live content are unchanged can be skipped
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(results)")]
+        if columns and "diff_path" not in columns:
+            # Results from before the dashboard point at per-document HTML reports
+            self.db.execute("DROP TABLE results")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "docx TEXT, url TEXT, draft_mtime REAL, draft_size INTEGER, draft_hash TEXT, live_hash TEXT, "
+            "similarity REAL, markdown TEXT, summary TEXT, diff_path TEXT, PRIMARY KEY (docx, url))"
+        )
+        self.db.commit()
+
+    def get(self, docx_file, url):
+        with self.lock:
+            if self.db is None:
+                return None
+            row = self.db.execute(
+                "SELECT draft_mtime, draft_size, draft_hash, live_hash, similarity, markdown, summary, diff_path "
+                "FROM results WHERE docx = ? AND url = ?", (docx_file, url)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("draft_mtime", "draft_size", "draft_hash", "live_hash", "similarity", "markdown", "summary", "diff_path")
+        return dict(zip(keys, row))
+
+    def put(self, docx_file, url, draft_mtime, draft_size, draft_hash, live_hash, similarity, markdown, summary, diff_path):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (docx_file, url, draft_mtime, draft_size, draft_hash, live_hash, similarity, markdown, summary, diff_path),
+            )
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+            self.db = None
+
+def compare_document(docx_path, docx_file, url, page, diff_path=None, previous=None, profile_path=None, method="greedy", scorer="ratio"):
+    # Runs in a worker process. previous is the stored (draft_hash, live_hash)
+    # for this pair; if both still match, the comparison is skipped. With
+    # profile_path, the whole document is run under cProfile and dumped there.
+    if not profile_path:
+        return _compare_document(docx_path, docx_file, url, page, diff_path, previous, method, scorer)
+    profiler = cProfile.Profile()
+    result = profiler.runcall(_compare_document, docx_path, docx_file, url, page, diff_path, previous, method, scorer)
+    profiler.dump_stats(profile_path)
+    return result
+
+def _compare_document(docx_path, docx_file, url, page, diff_path, previous, method, scorer):
+    metrics = {}
+    STATS.clear()
+    try:
+        start = time.perf_counter()
+        draft_text = get_docx_text(docx_path)
+        metrics["docx_parse_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        live_text, title, meta_desc = page
+        draft_text, live_text = normalize_blocks([draft_text, live_text])
+        metrics["normalize_s"] = time.perf_counter() - start
+        if "[ERROR" in live_text:
+            return DocumentResult(f"## {docx_file} vs {url}\n❌ {live_text}\n\n", f"❌ {url}: Error", None, None, None, metrics, live_text)
+
+        draft_hash = content_hash(draft_text)
+        if previous == (draft_hash, content_hash(*page, method, scorer)):
+            return DocumentResult(None, None, diff_path, draft_hash, None, metrics)
+
+        # Get both alignment results and similarity score from block_compare
+        start = time.perf_counter()
+        diff, similarity = block_compare(draft_text, live_text, method=method, scorer=scorer)
+        metrics["compare_s"] = time.perf_counter() - start
+        metrics.update(STATS)
+
+        start = time.perf_counter()
+        markdown_report = format_result_as_markdown(docx_file, url, title, meta_desc, similarity, diff)
+        if diff_path:
+            with open(diff_path, "w", encoding="utf-8") as f:
+                write_diff_script(f, diff_url(diff_path), docx_file, url, title, meta_desc, similarity, diff)
+        metrics["report_s"] = time.perf_counter() - start
+        return DocumentResult(markdown_report, f"{url} → Similarity: {similarity:.2%}", diff_path, draft_hash, similarity, metrics)
+    except Exception as e:
+        return DocumentResult(f"## {docx_file} vs {url}\n❌ Error: {str(e)}\n\n", f"❌ {url}: Error", None, None, None, metrics, f"Error: {e}")
+
+# ------------------ Metrics ------------------
+
+TIMED_STAGES = ["fetch_s", "render_s", "extract_s", "docx_parse_s", "normalize_s", "compare_s", "report_s"]
+COUNTERS = ["bytes", "draft_blocks", "live_blocks", "ratio_calls"]
+
+def document_metrics(index, docx_file, url, status, fetch_metrics, result):
+    record = {"index": index + 1, "docx": docx_file, "url": url, "status": status, "similarity": None}
+    record.update(fetch_metrics or {})
+    if result is not None:
+        record["similarity"] = result.similarity
+        record.update(result.metrics or {})
+    # Extraction and rendering are already inside fetch_s
+    record["total_s"] = sum(record.get(stage, 0.0) for stage in TIMED_STAGES if stage not in ("render_s", "extract_s"))
+    return record
+
+def summarize_metrics(records):
+    totals = {key: sum(record.get(key, 0) for record in records) for key in TIMED_STAGES + COUNTERS + ["total_s"]}
+    return {
+        "documents": len(records),
+        "status": dict(Counter(record["status"] for record in records)),
+        "cache": dict(Counter(record.get("cache", "off") for record in records)),
+        "totals": totals,
+        "slowest": [record["index"] for record in sorted(records, key=lambda r: r["total_s"], reverse=True)[:10]],
+    }
+
+def write_metrics(path, records):
+    records = sorted(records, key=lambda record: record["index"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"summary": summarize_metrics(records), "documents": records}, f, indent=2)
+
+def format_timing_summary(records):
+    summary = summarize_metrics(records)
+    totals = summary["totals"]
+    report = "## Timing Summary\n\n"
+    report += "| Stage | Total (s) |\n|---|---|\n"
+    for stage in TIMED_STAGES:
+        report += f"| {stage[:-2].replace('_', ' ')} | {totals[stage]:.2f} |\n"
+    report += f"\n**Bytes fetched**: {totals['bytes']:,} · **ratio() calls**: {totals['ratio_calls']:,}"
+    report += f" · **Page cache**: {', '.join(f'{k} {v}' for k, v in sorted(summary['cache'].items()))}\n\n"
+    slowest = sorted(records, key=lambda r: r["total_s"], reverse=True)[:10]
+    if slowest:
+        report += "### Slowest Documents\n\n| # | Draft | URL | Total (s) | Fetch (s) | Compare (s) | Blocks (draft/live) |\n|---|---|---|---|---|---|---|\n"
+        for r in slowest:
+            report += (
+                f"| {r['index']} | {r['docx']} | {r['url']} | {r['total_s']:.2f} | {r.get('fetch_s', 0):.2f} | "
+                f"{r.get('compare_s', 0):.2f} | {r.get('draft_blocks', 0)}/{r.get('live_blocks', 0)} |\n"
+            )
+        report += "\n"
+    return report
+
+def _can_reuse(stored, diff_path, live_hash):
+    return (
+        stored is not None
+        and stored["live_hash"] == live_hash
+        and stored["diff_path"] == diff_path
+        and (diff_path is None or os.path.exists(diff_path))
+    )
+
+def _feed_comparisons(pool, folder, matches, options, results, cancel, state, store, pending, submitted, on_status):
+    # Hands each page to the process pool as soon as its fetch finishes,
+    # answering straight from the run state when nothing has changed. Every
+    # index that gets a result coming is added to submitted; if feeding stops
+    # early (a worker died and broke the pool, or anything else went wrong),
+    # the rest are answered with an error so run_batch never waits on them.
+    error = "Error: comparison stopped"
+    try:
+        if store:
+            pages = stored_pages(store, [url for _, url in matches])
+        else:
+            on_fetch = (lambda index: on_status(index, "fetching", None)) if on_status else None
+            pages = fetch_pages((url for _, url in matches), max_workers=options.fetch_workers, on_start=on_fetch)
+        profile_dir = os.path.join(options.output_dir, "profiles") if options.profile else None
+        for index, page, fetch_metrics in pages:
+            if cancel.is_set():
+                break
+            docx_file, url = matches[index]
+            docx_path = os.path.join(folder, docx_file)
+            name = os.path.splitext(os.path.basename(docx_file))[0]
+            diff_path = os.path.join(options.output_dir, DIFF_DIR, diff_file_name(index, docx_file)) if options.write_html else None
+            profile_path = os.path.join(profile_dir, f"report_{index + 1}_{name}.prof") if profile_dir else None
+            # The alignment method, scorer and draft extractor version are part of
+            # the page hash, so changing any of them invalidates stored results even
+            # for a DOCX whose modification time and size are unchanged
+            live_hash = content_hash(*page, options.method, options.scorer, str(DOCX_TEXT_VERSION))
+            try:
+                stat = os.stat(docx_path)
+            except OSError:
+                stat = None
+            stored = state.get(docx_file, url) if state and stat else None
+            if not _can_reuse(stored, diff_path, live_hash):
+                stored = None
+            pending[index] = (stat, live_hash, stored, fetch_metrics)
+
+            if stored and (stored["draft_mtime"], stored["draft_size"]) == (stat.st_mtime, stat.st_size):
+                # Same file, same page: no need to even open the DOCX
+                future = Future()
+                future.set_result(DocumentResult(None, None, diff_path, stored["draft_hash"], None))
+            else:
+                previous = (stored["draft_hash"], live_hash) if stored else None
+                if on_status:
+                    on_status(index, "comparing", None)
+                try:
+                    future = pool.submit(
+                        compare_document, docx_path=docx_path, docx_file=docx_file, url=url, page=page, diff_path=diff_path,
+                        previous=previous, profile_path=profile_path, method=options.method, scorer=options.scorer,
+                    )
+                except RuntimeError as e:
+                    # BrokenProcessPool: a worker process died
+                    error = f"Error: {e}"
+                    break
+            submitted.add(index)
+            future.add_done_callback(lambda f, index=index: results.put((index, f)))
+    except Exception as e:
+        error = f"Error: {e}"
+    finally:
+        if not cancel.is_set():
+            for index, (docx_file, url) in enumerate(matches):
+                if index not in submitted:
+                    future = Future()
+                    future.set_result(DocumentResult(f"## {docx_file} vs {url}\n❌ {error}\n\n", f"❌ {url}: Error",
+                                                     None, None, None, error=error))
+                    submitted.add(index)
+                    results.put((index, future))
+
+def run_batch(folder, matches, options=BatchOptions(), cancel=None, on_progress=None, on_status=None, poll=None):
+    # Compares each (docx_file, url) pair and writes the reports to
+    # options.output_dir (the DOCX folder by default), with compare_workers
+    # processes comparing and fetch_workers threads fetching. method and scorer
+    # pick the block_compare alignment engine and similarity. crawl_store reads
+    # the pages from a crawl instead of fetching them; it must exist, or
+    # sqlite3.Error is raised. With incremental, pairs whose draft and page
+    # are unchanged since the last run in output_dir reuse the stored result.
+    # on_progress(done, total) is called as each document finishes and poll()
+    # while waiting. on_status(index, status, result) follows each document
+    # through "fetching" and "comparing" to "ok", "reused" or "error" with its
+    # DocumentResult; it is also called from the fetch and feeder threads.
+    # Reports are streamed to disk as documents finish: the markdown report,
+    # and with write_html the dashboard and its diffs/ scripts. Per-document
+    # timings and counters go to metrics.json; profile adds a cProfile dump per
+    # document under profiles/.
+    # Returns (summary lines, markdown report path, dashboard path or None).
+    options = options._replace(output_dir=options.output_dir or folder)
+    output_dir = options.output_dir
+    store = CrawlStore(options.crawl_store, readonly=True) if options.crawl_store else None
+    os.makedirs(output_dir, exist_ok=True)
+    cancel = cancel or threading.Event()
+    state = RunState(os.path.join(output_dir, STATE_FILE)) if options.incremental else None
+    pending = {}
+    submitted = set()
+    records = []
+    if options.profile:
+        os.makedirs(os.path.join(output_dir, "profiles"), exist_ok=True)
+    if options.write_html:
+        os.makedirs(os.path.join(output_dir, DIFF_DIR), exist_ok=True)
+    total = len(matches)
+    writer = BatchReportWriter(output_dir, dashboard=options.write_html)
+    summary = [""] * total
+    results = queue.Queue()
+    pool = ProcessPoolExecutor(max_workers=max(1, min(options.compare_workers, total)))
+    feeder = threading.Thread(
+        target=_feed_comparisons,
+        kwargs=dict(pool=pool, folder=folder, matches=matches, options=options, results=results, cancel=cancel, state=state,
+                    store=store, pending=pending, submitted=submitted, on_status=on_status),
+        daemon=True,
+    )
+    feeder.start()
+    done = 0
+    try:
+        while done < total and not cancel.is_set():
+            try:
+                index, future = results.get(timeout=0.1)
+            except queue.Empty:
+                if poll:
+                    poll()
+                if not feeder.is_alive() and results.empty() and done >= len(submitted):
+                    break  # nothing more can arrive
+                continue
+            docx_file, url = matches[index]
+            stat, live_hash, stored, fetch_metrics = pending.pop(index, (None, None, None, None))
+            try:
+                result = future.result()
+            except Exception as e:
+                result = DocumentResult(f"## {docx_file} vs {url}\n❌ Error: {str(e)}\n\n", f"❌ {url}: Error", None, None, None,
+                                        error=f"Error: {e}")
+            status = "ok" if result.similarity is not None else "error"
+            if result.markdown is None:
+                # Unchanged since the last run
+                status = "reused"
+                result = DocumentResult(stored["markdown"], stored["summary"], stored["diff_path"], stored["draft_hash"],
+                                        stored["similarity"], result.metrics)
+            record = document_metrics(index, docx_file, url, status, fetch_metrics, result)
+            records.append(record)
+            if state and stat and result.similarity is not None:
+                state.put(docx_file, url, stat.st_mtime, stat.st_size, result.draft_hash, live_hash,
+                          result.similarity, result.markdown, result.summary, result.diff_path)
+            writer.add(index, docx_file, url, result, record)
+            summary[index] = result.summary
+            done += 1
+            if on_status:
+                on_status(index, status, result)
+            if on_progress:
+                on_progress(done, total)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        writer.close(format_timing_summary(records))
+        write_metrics(os.path.join(output_dir, "metrics.json"), records)
+        if state or store:
+            feeder.join(timeout=1)
+        if state:
+            state.close()
+        if store:
+            store.close()
+    if cancel.is_set():
+        summary = [line if line else f"⏹ {url}: Cancelled" for line, (_, url) in zip(summary, matches)]
+    else:
+        summary = [line if line else f"❌ {url}: Error" for line, (_, url) in zip(summary, matches)]
+    return summary, writer.md_path, writer.dashboard_path
+
+def load_manifest(path):
+    # Reads docx -> URL pairs from a CSV (docx,url columns, header optional)
+    # or a JSON list of {"docx": ..., "url": ...} objects or [docx, url] pairs
+    with open(path, encoding="utf-8-sig") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+            rows = [(row["docx"], row["url"]) if isinstance(row, dict) else tuple(row) for row in rows]
+        else:
+            rows = [tuple(row[:2]) for row in csv.reader(f) if len(row) >= 2]
+            if rows and rows[0][0].strip().lower() == "docx" and rows[0][1].strip().lower() == "url":
+                rows = rows[1:]
+    return [(docx_file.strip(), url.strip()) for docx_file, url in rows if docx_file.strip() and url.strip()]
+
+# ------------------ Command Line ------------------
+
+def cli_main(argv=None):
+    global CACHE_ENABLED, CACHE_DIR, OFFLINE, RENDER_ENABLED, RENDER_TABS
+    parser = argparse.ArgumentParser(prog="python -m main", description="Compare draft DOCX files against live webpages without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cache_options = argparse.ArgumentParser(add_help=False)
+    cache_options.add_argument("--offline", action="store_true", help="Use cached pages only")
+    cache_options.add_argument("--no-cache", action="store_true", help="Don't read or write the page cache")
+    cache_options.add_argument("--cache-dir", help=f"Page cache location (default: {CACHE_DIR})")
+    cache_options.add_argument("--render", action="store_true",
+                               help="Render pages that come back thin in headless Chromium (needs Playwright)")
+    cache_options.add_argument("--render-tabs", type=int, default=RENDER_TABS, help="Pages rendered at once")
+
+    compare = commands.add_parser("compare", parents=[cache_options], help="Compare every docx/URL pair listed in a manifest")
+    compare.add_argument("manifest", help="CSV (docx,url) or JSON manifest of docx -> URL pairs")
+    compare.add_argument("--folder", help="Folder the DOCX paths are relative to (default: the manifest's folder)")
+    compare.add_argument("--output", help="Folder to write reports to (default: the DOCX folder)")
+    compare.add_argument("--workers", type=int, default=COMPARE_WORKERS, help="Comparison processes (default: CPU count)")
+    compare.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS, help="Concurrent page fetches")
+    compare.add_argument("--no-html", action="store_true", help="Only write the markdown report, not the dashboard")
+    compare.add_argument("--full", action="store_true", help="Recompare every pair, ignoring results from earlier runs")
+    compare.add_argument("--profile", action="store_true", help="Write a cProfile dump per document to profiles/")
+    compare.add_argument("--method", choices=ALIGNMENT_METHODS, default="greedy",
+                         help="Block alignment: greedy first-come matching or an order-preserving optimal alignment")
+    compare.add_argument("--scorer", choices=list(SCORERS), default="ratio",
+                         help="Block similarity: character ratio, or the faster word-level jaccard or cosine")
+    compare.add_argument("--crawl-store", help="Read the pages from this crawl store instead of fetching them")
+
+    match = commands.add_parser("match", parents=[cache_options],
+                                help="Suggest the URL for each DOCX in a folder and write a manifest")
+    match.add_argument("folder", help="Folder containing the DOCX files")
+    source = match.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sitemap", help="sitemap.xml URL, or a site URL whose /sitemap.xml is used")
+    source.add_argument("--urls", help="Text file with one candidate URL per line")
+    source.add_argument("--crawl-store", help="Match against the pages in this crawl store")
+    match.add_argument("--output", help="Manifest to write (default: manifest.csv in the folder)")
+    match.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS, help="Concurrent page fetches")
+
+    crawl_parser = commands.add_parser("crawl", parents=[cache_options],
+                                       help="Crawl a site into a store that match and compare can read")
+    crawl_parser.add_argument("seeds", nargs="+", help="Start URLs")
+    crawl_parser.add_argument("--store", default=CRAWL_STORE, help=f"Crawl store to write, and resume (default: {CRAWL_STORE})")
+    crawl_parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES, help="Stop queueing new URLs after this many")
+    crawl_parser.add_argument("--max-depth", type=int, default=CRAWL_MAX_DEPTH, help="Links followed from the seeds")
+    crawl_parser.add_argument("--workers", type=int, default=CRAWL_WORKERS, help="Concurrent fetches")
+    crawl_parser.add_argument("--delay", type=float, default=CRAWL_DELAY, help="Seconds between requests to one host")
+    crawl_parser.add_argument("--all-hosts", action="store_true", help="Follow links to other hosts too")
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        CACHE_ENABLED = False
+    if args.cache_dir:
+        CACHE_DIR = args.cache_dir
+    OFFLINE = args.offline
+    if args.render and not playwright_available():
+        parser.error("--render needs Playwright: pip install playwright && playwright install chromium")
+    RENDER_ENABLED = args.render
+    RENDER_TABS = args.render_tabs
+
+    if args.command == "crawl":
+        return _crawl_command(args)
+    if args.command == "match":
+        return _match_command(args)
+    return _compare_command(args)
+
+def _compare_command(args):
+    try:
+        matches = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Could not read manifest {args.manifest}: {e}", file=sys.stderr)
+        return 1
+    if not matches:
+        print(f"No docx/URL pairs found in {args.manifest}", file=sys.stderr)
+        return 1
+    folder = args.folder or os.path.dirname(os.path.abspath(args.manifest))
+
+    def on_progress(done, total):
+        print(f"[{done}/{total}]", file=sys.stderr)
+
+    try:
+        options = BatchOptions(
+            output_dir=args.output, compare_workers=args.workers, fetch_workers=args.fetch_workers,
+            write_html=not args.no_html, incremental=not args.full, profile=args.profile,
+            method=args.method, scorer=args.scorer, crawl_store=args.crawl_store,
+        )
+        summary, md_path, dashboard_path = run_batch(folder, matches, options, on_progress=on_progress)
+    except sqlite3.Error as e:
+        print(e, file=sys.stderr)
+        return 1
+    print("\n".join(summary))
+    print(f"Markdown saved to: {md_path}")
+    if dashboard_path:
+        print(f"Dashboard saved to: {dashboard_path}")
+    return 1 if any(line.startswith("❌") for line in summary) else 0
+
+def _match_command(args):
+    docx_files = sorted(f for f in os.listdir(args.folder) if f.endswith(".docx")) if os.path.isdir(args.folder) else []
+    if not docx_files:
+        print(f"No .docx files found in {args.folder}", file=sys.stderr)
+        return 1
+    try:
+        if args.crawl_store:
+            index = stored_page_index(args.crawl_store)
+        else:
+            urls = fetch_sitemap_urls(args.sitemap) if args.sitemap else read_url_list(args.urls)
+            print(f"Indexing {len(urls)} pages", file=sys.stderr)
+            index = build_page_index(urls, fetch_workers=args.fetch_workers)
+    except (OSError, requests.RequestException, ET.ParseError, sqlite3.Error) as e:
+        print(f"Could not read candidate URLs: {e}", file=sys.stderr)
+        return 1
+    suggestions = match_documents(args.folder, docx_files, index)
+
+    output = args.output or os.path.join(args.folder, "manifest.csv")
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["docx", "url", "confidence"])
+        for docx_file in docx_files:
+            match = suggestions.get(docx_file)
+            writer.writerow([docx_file, match.url if match else "", f"{match.confidence:.2f}" if match else ""])
+    review = [f for f in docx_files if f not in suggestions or suggestions[f].confidence < MATCH_CONFIDENCE]
+    for docx_file in review:
+        match = suggestions.get(docx_file)
+        print(f"Review: {docx_file} -> {f'{match.url} ({match.confidence:.0%})' if match else 'no match'}", file=sys.stderr)
+    print(f"Matched {len(suggestions)} of {len(docx_files)} documents, {len(review)} to review")
+    print(f"Manifest saved to: {output}")
+    return 0
+
+def _crawl_command(args):
+    reported = [0]
+
+    def on_progress(counts):
+        finished = sum(count for state, count in counts.items() if state not in ("queued", "fetching"))
+        if finished // 25 > reported[0] // 25:
+            print(f"[{finished} crawled, {counts.get('queued', 0)} queued]", file=sys.stderr)
+        reported[0] = finished
+
+    try:
+        counts = crawl(args.seeds, args.store, max_pages=args.max_pages, max_depth=args.max_depth,
+                       workers=args.workers, delay=args.delay, same_host=not args.all_hosts, on_progress=on_progress)
+    except KeyboardInterrupt:
+        print(f"Interrupted; run the same command again to resume from {args.store}", file=sys.stderr)
+        return 1
+    print(", ".join(f"{count} {state}" for state, count in sorted(counts.items())))
+    print(f"Crawl store saved to: {args.store}")
+    return 0
+
+# ------------------ GUI Setup ------------------
+
+cancel_event = threading.Event()
+gui_events = queue.Queue()  # (kind, *args) from the batch thread, drained on the Tk thread
+report_paths = {}  # status row id -> dashboard URL opened at that document
+
+STATUS_LABELS = {
+    "fetching": "Fetching",
+    "comparing": "Comparing",
+    "ok": "Done",
+    "reused": "Done (unchanged)",
+    "error": "Error",
+}
+
+def _run_batch_in_background(folder, matches):
+    # Runs on a worker thread; never touches Tk, only posts to gui_events
+    try:
+        summary, md_path, dashboard_path = run_batch(
+            folder, matches, cancel=cancel_event,
+            on_progress=lambda done, total: gui_events.put(("progress", done)),
+            on_status=lambda index, status, result: gui_events.put(("status", index, status, result)),
+        )
+    except Exception as e:
+        gui_events.put(("failed", str(e)))
+    else:
+        gui_events.put(("finished", summary, md_path, dashboard_path))
+
+def _index_in_background(site, folder, docx_files):
+    # Runs on a worker thread: builds the page index and the URL suggestions
+    try:
+        urls = fetch_sitemap_urls(site)
+        index = build_page_index(urls, on_progress=lambda done, total: gui_events.put(("index_progress", done, total)))
+        gui_events.put(("indexed", match_documents(folder, docx_files, index)))
+    except Exception as e:
+        gui_events.put(("index_failed", str(e)))
+
 def run_batch_comparison():
+    from tkinter import filedialog, messagebox, simpledialog
+
     folder = filedialog.askdirectory(title="Select Folder Containing Draft DOCX Files")
     if not folder:
         return
@@ -438,58 +2788,128 @@ def run_batch_comparison():
     if not docx_files:
         messagebox.showerror("Error", "No .docx files found in the selected folder.")
         return
-    matches = get_document_url_pairs(docx_files)
+    site = simpledialog.askstring(
+        "Suggest URLs", "Sitemap or site URL to suggest matching pages from\n(leave blank to enter every URL by hand):", parent=root
+    )
+    if not site or not site.strip():
+        start_batch(folder, docx_files)
+        return
+    button["state"] = "disabled"
+    text_area.delete(1.0, "end")
+    text_area.insert("end", f"Indexing pages from {site.strip()}...\n")
+    threading.Thread(target=_index_in_background, args=(site.strip(), folder, docx_files), daemon=True).start()
+    root.after(100, poll_index_events, folder, docx_files)
+
+def poll_index_events(folder, docx_files):
+    from tkinter import messagebox
+
+    while True:
+        try:
+            kind, *args = gui_events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "index_progress":
+            progress_bar["maximum"], progress_bar["value"] = args[1], args[0]
+        elif kind == "index_failed":
+            messagebox.showerror("Error", f"Could not index the site:\n{args[0]}\n\nEnter the URLs by hand instead.")
+            start_batch(folder, docx_files)
+            return
+        else:
+            start_batch(folder, docx_files, args[0])
+            return
+    root.after(100, poll_index_events, folder, docx_files)
+
+def start_batch(folder, docx_files, suggestions=None):
+    progress_bar["value"] = 0
+    matches = get_document_url_pairs(docx_files, suggestions)
     if not matches:
+        button["state"] = "normal"
         return
-    total = len(matches)
-    progress_bar["maximum"] = total
+    progress_bar["maximum"] = len(matches)
     progress_bar["value"] = 0
-    report_md = "# Batch Comparison Report\n\n"
-    summary = []
-    for i, (docx_file, url) in enumerate(matches, start=1):
-        full_path = os.path.join(folder, docx_file)
+    button["state"] = "disabled"
+    cancel_button["state"] = "normal"
+    cancel_event.clear()
+    status_table.delete(*status_table.get_children())
+    report_paths.clear()
+    for index, (docx_file, url) in enumerate(matches):
+        status_table.insert("", "end", iid=str(index), values=(index + 1, docx_file, url, "Queued", ""))
+    text_area.delete(1.0, "end")
+
+    threading.Thread(target=_run_batch_in_background, args=(folder, matches), daemon=True).start()
+    root.after(100, poll_gui_events, pathlib.Path(folder, DASHBOARD_FILE).resolve().as_uri(), len(matches))
+
+def poll_gui_events(dashboard_url, total):
+    # Applies everything the batch thread has posted, then reschedules itself
+    # until the batch reports that it has finished
+    while True:
         try:
-            draft_text = normalize_text(get_docx_text(full_path))
-            live_text, title, meta_desc = get_webpage_text(url)
-            live_text = normalize_text(live_text)
-            if "[ERROR" in live_text:
-                report_md += f"## {docx_file} vs {url}\n❌ {live_text}\n\n"
-                summary.append(f"❌ {url}: Error")
-                continue
-            
-            # Get both alignment results and similarity score from block_compare
-            diff, similarity = block_compare(draft_text, live_text)
-            
-            html_report = format_result_as_html(docx_file, url, title, meta_desc, similarity, diff)
-            markdown_report = format_result_as_markdown(docx_file, url, title, meta_desc, similarity, diff)
-
-            html_file_path = os.path.join(folder, f"report_{i}_{os.path.splitext(docx_file)[0]}.html")
-            with open(html_file_path, "w", encoding="utf-8") as f:
-                f.write(f"<html><head><meta charset='UTF-8'><title>Comparison Report</title></head><body>{html_report}</body></html>")
-            if i == total:
-                webbrowser.open(f"file://{html_file_path}")
-
-            report_md += markdown_report
-            summary.append(f"{url} → Similarity: {similarity:.2%}")
-
-        except Exception as e:
-            report_md += f"## {docx_file} vs {url}\n❌ Error: {str(e)}\n\n"
-            summary.append(f"❌ {url}: Error")
-        progress_bar["value"] = i
-        root.update_idletasks()
-    md_path = os.path.join(folder, "comparison_report.md")
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(report_md)
-    text_area.delete(1.0, tk.END)
-    text_area.insert(tk.END, "Reports saved.\n\n" + "\n".join(summary))
-    messagebox.showinfo("Done", f"✅ Batch comparison complete.\nMarkdown saved to:\n{md_path}\nHTML reports saved alongside each docx.")
+            kind, *args = gui_events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == "progress":
+            progress_bar["value"] = args[0]
+        elif kind == "status":
+            index, status, result = args
+            row = str(index)
+            similarity = f"{result.similarity:.2%}" if result and result.similarity is not None else ""
+            status_table.set(row, "status", STATUS_LABELS[status])
+            status_table.set(row, "similarity", similarity)
+            if result:
+                if result.diff_path:
+                    report_paths[row] = f"{dashboard_url}#doc-{index + 1}"
+                text_area.insert("end", result.summary + "\n")
+                text_area.see("end")
+        else:
+            _finish_batch(kind, args, total)
+            return
+    root.after(100, poll_gui_events, dashboard_url, total)
+
+def _finish_batch(kind, args, total):
+    from tkinter import messagebox
+
+    cancel_button["state"] = "disabled"
+    button["state"] = "normal"
     progress_bar["value"] = 0
+    if kind == "failed":
+        messagebox.showerror("Error", f"Batch comparison failed:\n{args[0]}")
+        return
+    summary, md_path, dashboard_path = args
+    for row in status_table.get_children():
+        if status_table.set(row, "status") in ("Queued", "Fetching", "Comparing"):
+            status_table.set(row, "status", "Cancelled")
+    text_area.insert("end", f"\nReports saved.\nMarkdown saved to: {md_path}\n")
+    text_area.see("end")
+    if cancel_event.is_set():
+        done = sum(1 for line in summary if not line.startswith("⏹"))
+        messagebox.showinfo("Cancelled", f"⏹ Batch comparison cancelled after {done} of {total} documents.\nMarkdown saved to:\n{md_path}")
+        return
+    if dashboard_path:
+        webbrowser.open(pathlib.Path(dashboard_path).resolve().as_uri())
+    messagebox.showinfo("Done", f"✅ Batch comparison complete.\nMarkdown saved to:\n{md_path}\nDashboard saved to:\n{dashboard_path}")
 
-# ------------------ GUI Setup ------------------
+def open_selected_report(event=None):
+    for row in status_table.selection():
+        if row in report_paths:
+            webbrowser.open(report_paths[row])
+
+def cancel_batch():
+    cancel_event.set()
+    cancel_button["state"] = "disabled"
+
+def close_gui():
+    # Stop the batch thread's workers before the window goes away
+    cancel_event.set()
+    root.destroy()
+
+def launch_gui():
+    global root, button, cancel_button, progress_bar, status_table, text_area
+    import tkinter as tk
+    from tkinter import scrolledtext, ttk
 
-if __name__ == "__main__":
     root = tk.Tk()
     root.title("Manual Match Draft vs Webpage Comparison Tool")
+    root.protocol("WM_DELETE_WINDOW", close_gui)
 
     frame = tk.Frame(root)
     frame.pack(padx=10, pady=10)
@@ -497,10 +2917,31 @@ if __name__ == "__main__":
     button = tk.Button(frame, text="Run Manual Match & Compare", command=run_batch_comparison)
     button.pack(pady=5)
 
+    cancel_button = tk.Button(frame, text="Cancel", command=cancel_batch, state="disabled")
+    cancel_button.pack(pady=5)
+
     progress_bar = ttk.Progressbar(frame, orient="horizontal", length=600, mode="determinate")
     progress_bar.pack(pady=5)
 
+    # One row per document, updated as it is fetched, compared and finished;
+    # double-click a finished row to open its report
+    columns = ("number", "document", "url", "status", "similarity")
+    status_table = ttk.Treeview(root, columns=columns, show="headings", height=10)
+    for column, heading, width in zip(columns, ("#", "Document", "URL", "Status", "Similarity"), (40, 220, 320, 130, 90)):
+        status_table.heading(column, text=heading)
+        status_table.column(column, width=width, anchor="w")
+    status_table.bind("<Double-1>", open_selected_report)
+    status_table.pack(padx=10, pady=5, fill="both", expand=True)
+
     text_area = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=60, height=10)
     text_area.pack(padx=10, pady=10)
 
-    root.mainloop() 
\ No newline at end of file
+    root.mainloop()
+
+if __name__ == "__main__":
+    # Required for the comparison process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+
+    if len(sys.argv) > 1:
+        sys.exit(cli_main())
+    launch_gui()
@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The app is a single module at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PageServer:
+    # Serves canned responses from localhost. Each path maps to a function of
+    # the request headers returning (status, headers, body bytes); every
+    # request's path and headers are kept in requests.
+
+    def __init__(self):
+        self.pages = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                respond = server.pages.get(self.path)
+                status, headers, body = respond(self.headers) if respond else (404, {}, b"")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def add(self, path, body=b"", status=200, headers=None):
+        # A fixed response; body may be str (sent as UTF-8 HTML) or bytes
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+            headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+        return self.route(path, lambda request_headers: (status, headers or {}, body))
+
+    def route(self, path, respond):
+        self.pages[path] = respond
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def page_server():
+    server = PageServer()
+    yield server
+    server.close()
@@ -0,0 +1,57 @@
+import os
+
+from docx import Document
+
+import main
+
+PAGE = "<html><head><title>Services</title></head><body><main><h1>Our Services</h1><p>We fix roofs.</p></main></body></html>"
+
+
+def run(folder, url):
+    statuses = {}
+    main.run_batch(str(folder), [("draft.docx", url)], main.BatchOptions(compare_workers=1),
+                   on_status=lambda index, status, result: statuses.__setitem__(index, status))
+    return statuses[0]
+
+
+def test_stored_results_are_dropped_when_the_draft_extractor_changes(tmp_path, page_server, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_ENABLED", False)
+    doc = Document()
+    doc.add_heading("Our Services", 1)
+    doc.add_paragraph("We fix roofs.")
+    doc.save(tmp_path / "draft.docx")
+    url = page_server.add("/services", PAGE)
+
+    assert run(tmp_path, url) == "ok"
+    assert run(tmp_path, url) == "reused"
+    # Same DOCX modification time and size, but its text is now read differently
+    monkeypatch.setattr(main, "DOCX_TEXT_VERSION", main.DOCX_TEXT_VERSION + 1)
+    assert run(tmp_path, url) == "ok"
+    assert run(tmp_path, url) == "reused"
+
+
+def test_report_sections_are_written_as_they_finish(tmp_path):
+    writer = main.BatchReportWriter(str(tmp_path))
+
+    def add(index):
+        section = f"## doc {index} vs café\n\n"
+        result = main.DocumentResult(section, "", None, None, 0.5, {})
+        writer.add(index, f"doc {index}", "http://example.com/", result, {"status": "ok"})
+
+    def on_disk(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    # Document 0 is still running; the later ones don't wait for it
+    add(2)
+    add(1)
+    assert on_disk(writer.md_path).endswith("## doc 2 vs café\n\n## doc 1 vs café\n\n")
+    assert on_disk(writer.dashboard_path).count("<tr id=") == 2
+    add(0)
+    writer.close("Trailer\n")
+    assert on_disk(writer.md_path) == (
+        "# Batch Comparison Report\n\n"
+        + "".join(f"## doc {index} vs café\n\n" for index in range(3))
+        + "Trailer\n"
+    )
+    assert sorted(os.listdir(tmp_path)) == sorted([main.DASHBOARD_FILE, "comparison_report.md"])
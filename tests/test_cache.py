@@ -0,0 +1,106 @@
+import os
+import time
+
+import pytest
+
+import main
+
+
+def page(text):
+    return f"<html><head><title>Cached</title></head><body><main><h1>{text}</h1><p>{text} body.</p></main></body></html>"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "cache")
+    monkeypatch.setattr(main, "CACHE_ENABLED", True)
+    monkeypatch.setattr(main, "CACHE_DIR", directory)
+    monkeypatch.setattr(main, "CACHE_TTL", 0)
+    monkeypatch.setattr(main, "OFFLINE", False)
+    monkeypatch.setattr(main, "RENDER_ENABLED", False)
+    return directory
+
+
+def fetch(url):
+    metrics = {}
+    text, _, _ = main.get_webpage_text(url, metrics)
+    return text, metrics["cache"]
+
+
+def versioned(server, path, validator, request_header):
+    # A page whose current version is versions[0]; answers 304 when the request
+    # carries that version's validator
+    versions = [1]
+
+    def respond(headers):
+        value = validator(versions[0])
+        if headers.get(request_header) == value:
+            return 304, {}, b""
+        header = "ETag" if request_header == "If-None-Match" else "Last-Modified"
+        return 200, {"Content-Type": "text/html", header: value}, page(f"Version {versions[0]}").encode("utf-8")
+
+    return server.route(path, respond), versions
+
+
+@pytest.mark.parametrize("validator, request_header", [
+    (lambda version: f'"v{version}"', "If-None-Match"),
+    (lambda version: f"Mon, 0{version} Jan 2024 00:00:00 GMT", "If-Modified-Since"),
+])
+def test_cached_page_is_revalidated(cache_dir, page_server, validator, request_header):
+    url, versions = versioned(page_server, "/page", validator, request_header)
+    assert fetch(url) == ("<h1>Version 1</h1>\n\nVersion 1 body.", "miss")
+    assert fetch(url) == ("<h1>Version 1</h1>\n\nVersion 1 body.", "revalidated")
+    assert page_server.requests[-1][1][request_header] == validator(1)
+    versions[0] = 2
+    assert fetch(url) == ("<h1>Version 2</h1>\n\nVersion 2 body.", "miss")
+    assert fetch(url)[1] == "revalidated"
+
+
+def test_cached_page_is_trusted_until_its_ttl_expires(cache_dir, page_server, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_TTL", 0.5)
+    url, _ = versioned(page_server, "/page", lambda version: f'"v{version}"', "If-None-Match")
+    assert fetch(url)[1] == "miss"
+    assert fetch(url)[1] == "hit"
+    assert len(page_server.requests) == 1
+    time.sleep(0.6)
+    assert fetch(url)[1] == "revalidated"
+    assert len(page_server.requests) == 2
+
+
+def test_offline_mode_only_reads_the_cache(cache_dir, page_server, monkeypatch):
+    url = page_server.add("/page", page("Stored"))
+    assert fetch(url)[1] == "miss"
+    monkeypatch.setattr(main, "OFFLINE", True)
+    # Served however old the entry is
+    assert fetch(url) == ("<h1>Stored</h1>\n\nStored body.", "hit")
+    assert fetch(page_server.add("/other", page("Other"))) == ("[ERROR: Page not in cache (offline mode)]", "miss")
+    assert len(page_server.requests) == 1
+
+
+def test_eviction_drops_least_recently_used_entries_to_the_low_water_mark(tmp_path):
+    cache = main.PageCache(str(tmp_path), max_bytes=10_000)
+    entry = {"text": "x" * 400}
+    for i in range(10):
+        cache.put(f"http://example.com/{i}", entry, "y" * 400)
+        meta_path, html_path = cache._paths(f"http://example.com/{i}")
+        os.utime(meta_path, (1000 + i, 1000 + i))
+    entry_size = os.path.getsize(meta_path) + os.path.getsize(html_path)
+    # Reading an entry makes it the most recently used
+    assert cache.get("http://example.com/0")["text"] == entry["text"]
+    on_disk = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert cache.size == on_disk < cache.max_bytes
+
+    # Add entries until one takes the cache over its limit
+    last = 9
+    while cache.size + entry_size <= cache.max_bytes:
+        last += 1
+        cache.put(f"http://example.com/{last}", entry, "y" * 400)
+    last += 1
+    cache.put(f"http://example.com/{last}", entry, "y" * 400)
+    on_disk = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert cache.size == on_disk <= cache.max_bytes * main.CACHE_EVICT_TO
+    kept = [i for i in range(last + 1) if cache.get(f"http://example.com/{i}")]
+    # The oldest entries went first, and none went that didn't have to
+    assert kept[0] == 0 and kept[1:] == list(range(last + 2 - len(kept), last + 1))
+    assert cache.size + entry_size > cache.max_bytes * main.CACHE_EVICT_TO
+    assert all(cache.get_html(f"http://example.com/{i}") for i in kept)
@@ -0,0 +1,197 @@
+import difflib
+import random
+
+import pytest
+
+import main
+
+
+def split_into_blocks(text):
+    return [block.strip() for block in text.split("\n\n") if block.strip()]
+
+
+def reference_block_compare(draft, live, similarity_threshold=0.9):
+    # block_compare as it was before candidate pruning: every draft block is
+    # scored against every unmatched live block
+    draft_blocks = split_into_blocks(draft)
+    live_blocks = split_into_blocks(live)
+
+    draft_h1_index = next((i for i, block in enumerate(draft_blocks) if block.startswith('<h1>')), -1)
+    live_h1_index = next((i for i, block in enumerate(live_blocks) if block.startswith('<h1>')), -1)
+
+    total_draft_length = sum(len(block) for block in draft_blocks[draft_h1_index:]) if draft_h1_index != -1 else sum(len(block) for block in draft_blocks)
+    total_live_length = sum(len(block) for block in live_blocks[live_h1_index:]) if live_h1_index != -1 else sum(len(block) for block in live_blocks)
+    matched_content_length = 0
+
+    aligned = []
+    if draft_h1_index != -1 and live_h1_index != -1:
+        for i in range(draft_h1_index):
+            aligned.append(("missing", draft_blocks[i], ""))
+        for i in range(live_h1_index):
+            aligned.append(("current", "", live_blocks[i]))
+        draft_blocks = draft_blocks[draft_h1_index:]
+        live_blocks = live_blocks[live_h1_index:]
+
+    matched_live = set()
+    for db in draft_blocks:
+        best_match = None
+        best_score = 0
+        for lb in live_blocks:
+            if lb in matched_live:
+                continue
+            score = difflib.SequenceMatcher(None, db, lb).ratio()
+            if score > best_score:
+                best_score = score
+                best_match = lb
+
+        if best_score >= similarity_threshold:
+            matched_live.add(best_match)
+            aligned.append(("matched", db, best_match))
+            matched_content_length += len(db) * best_score
+        else:
+            partial_matches = []
+            partial_match_length = 0
+            for lb in live_blocks:
+                if lb in matched_live:
+                    continue
+                live_sentences = [s.strip() for s in lb.split('.') if s.strip()]
+                draft_sentences = [s.strip() for s in db.split('.') if s.strip()]
+                for ds in draft_sentences:
+                    for ls in live_sentences:
+                        match_score = difflib.SequenceMatcher(None, ds, ls).ratio()
+                        if match_score > 0.8:
+                            partial_matches.append((ds, ls))
+                            partial_match_length += len(ds) * match_score
+
+            if partial_matches:
+                combined_live = " ".join(m[1] for m in partial_matches)
+                matched_live.add(combined_live)
+                aligned.append(("matched", db, combined_live))
+                matched_content_length += partial_match_length
+            else:
+                aligned.append(("missing", db, best_match if best_match else ""))
+
+    for lb in live_blocks:
+        if lb not in matched_live:
+            aligned.append(("current", "", lb))
+
+    if total_draft_length == 0 or total_live_length == 0:
+        similarity = 0.0
+    else:
+        draft_similarity = matched_content_length / total_draft_length
+        live_similarity = matched_content_length / total_live_length
+        matched_blocks = sum(1 for tag, _, _ in aligned if tag == "matched")
+        total_blocks = len(aligned)
+        block_similarity = matched_blocks / total_blocks if total_blocks > 0 else 0
+        similarity = max(draft_similarity, live_similarity) * 0.7 + block_similarity * 0.3
+
+    return aligned, similarity
+
+
+WORDS = (
+    "our team service clients project support quality price offer local business "
+    "free quote call today help home repair install design custom fast"
+).split()
+
+
+def make_block(rng):
+    sentences = (" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) for _ in range(rng.randint(1, 4)))
+    return ". ".join(sentences).capitalize() + "."
+
+
+def make_pages(rng, blocks):
+    # A draft with repeated blocks and a live page that edits, drops, adds,
+    # repeats and sometimes reorders them
+    draft = [make_block(rng) for _ in range(blocks)]
+    for _ in range(rng.randint(1, 3)):
+        draft.insert(rng.randrange(len(draft) + 1), rng.choice(draft))
+    draft.insert(min(2, len(draft)), "<h1>" + make_block(rng) + "</h1>")
+    live = []
+    for block in draft:
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        if roll < 0.3:
+            chars = list(block)
+            for _ in range(rng.randint(1, 6)):
+                chars[rng.randrange(len(chars))] = rng.choice("abcdefg .")
+            block = "".join(chars)
+        elif roll < 0.4:
+            live.append(make_block(rng))
+        live.append(block)
+        if rng.random() < 0.1:
+            live.append(block)
+    if rng.random() < 0.2:
+        rng.shuffle(live)
+    return "\n\n".join(draft), "\n\n".join(live)
+
+
+@pytest.mark.parametrize("threshold", [0, 0.5, 0.9, 1.0])
+@pytest.mark.parametrize("seed", range(25))
+def test_greedy_matches_reference(seed, threshold):
+    draft, live = make_pages(random.Random(seed), 4 + seed % 12)
+    expected, expected_similarity = reference_block_compare(draft, live, threshold)
+    aligned, similarity = main.block_compare(draft, live, threshold)
+    assert list(aligned) == expected
+    assert similarity == pytest.approx(expected_similarity, rel=1e-12, abs=1e-12)
+
+
+def score_matrix(pairs):
+    scores = main.ScoreMatrix()
+    for i, j, score in sorted(pairs):
+        scores.add(i, j, score)
+    return scores
+
+
+def dense_best_chain_weight(pairs, draft_blocks, live_size):
+    # O(n·m) DP over the whole grid: best[i][j] is the heaviest chain using
+    # draft blocks before i and live blocks before j
+    score = {(i, j): s for i, j, s in pairs}
+    best = [[0.0] * (live_size + 1) for _ in range(len(draft_blocks) + 1)]
+    for i in range(1, len(draft_blocks) + 1):
+        for j in range(1, live_size + 1):
+            value = max(best[i - 1][j], best[i][j - 1])
+            if (i - 1, j - 1) in score:
+                value = max(value, best[i - 1][j - 1] + len(draft_blocks[i - 1]) * score[i - 1, j - 1])
+            best[i][j] = value
+    return best[-1][-1]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_best_chain_matches_dense_dp(seed):
+    rng = random.Random(seed)
+    draft_blocks = ["x" * rng.choice([5, 10, 20]) for _ in range(rng.randint(0, 15))]
+    live_size = rng.randint(0, 15)
+    density = rng.choice([0.1, 0.3, 0.8])
+    # Few distinct scores and lengths, so equal-weight chains are common
+    pairs = [
+        (i, j, rng.choice([0.5, 0.75, 1.0]))
+        for i in range(len(draft_blocks)) for j in range(live_size) if rng.random() < density
+    ]
+    chain = main._best_chain(score_matrix(pairs), draft_blocks, live_size)
+    assert set(chain) <= set(pairs)
+    assert all(a[0] < b[0] and a[1] < b[1] for a, b in zip(chain, chain[1:]))
+    weight = sum(len(draft_blocks[i]) * score for i, _, score in chain)
+    assert weight == pytest.approx(dense_best_chain_weight(pairs, draft_blocks, live_size))
+
+
+@pytest.mark.parametrize("pairs, live_size, expected", [
+    ([], 0, []),
+    ([], 3, []),
+    # Equal-weight chains: the one ending at the earliest pair wins
+    ([(0, 0, 1.0), (0, 1, 1.0)], 2, [(0, 0, 1.0)]),
+    ([(0, 1, 1.0), (1, 0, 1.0)], 2, [(0, 1, 1.0)]),
+    ([(0, 0, 1.0), (0, 1, 1.0), (1, 1, 1.0), (1, 2, 1.0)], 3, [(0, 0, 1.0), (1, 1, 1.0)]),
+    # Crossing pairs can't both be used; the heavier side wins
+    ([(0, 2, 0.5), (1, 0, 0.9), (2, 1, 0.9)], 3, [(1, 0, 0.9), (2, 1, 0.9)]),
+])
+def test_best_chain_edge_cases(pairs, live_size, expected):
+    assert main._best_chain(score_matrix(pairs), ["block"] * 3, live_size) == expected
+
+
+def test_optimal_alignment_of_empty_pages():
+    assert list(main.block_compare("", "", method="optimal")[0]) == []
+    aligned, similarity = main.block_compare("Only a draft.", "", method="optimal")
+    assert list(aligned) == [("missing", "Only a draft.", "")] and similarity == 0.0
+    aligned, similarity = main.block_compare("", "Only live.", method="optimal")
+    assert list(aligned) == [("current", "", "Only live.")] and similarity == 0.0
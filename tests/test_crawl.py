@@ -0,0 +1,96 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = 40
+
+
+def add_site(server, delay):
+    # Page n links to n+1 and n+2; each answer takes delay seconds
+    def page(n):
+        links = "".join(f"<a href='/p{m}'>next</a>" for m in (n + 1, n + 2) if m < PAGES)
+        body = f"<html><body><main><h1>Page {n}</h1><p>{'Content of page %d. ' % n * 20}</p>{links}</main></body></html>"
+
+        def respond(headers):
+            time.sleep(delay)
+            return 200, {"Content-Type": "text/html"}, body.encode("utf-8")
+        return respond
+
+    for n in range(PAGES):
+        server.route(f"/p{n}", page(n))
+    return server.route("/p0", page(0))
+
+
+def stored_urls(path):
+    try:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return {url for url, in db.execute("SELECT url FROM pages")}
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return set()  # not created yet, or mid-write
+
+
+def fetched(requests):
+    return [path for path, _ in requests if path != "/robots.txt"]
+
+
+def test_killed_crawl_resumes_without_refetching_committed_pages(tmp_path, page_server, monkeypatch):
+    seed = add_site(page_server, delay=0.05)
+    store = str(tmp_path / "crawl.sqlite")
+    script = (
+        "import main; main.CACHE_ENABLED = False; main.CRAWL_COMMIT_EVERY = 5; "
+        f"main.crawl([{seed!r}], {store!r}, delay=0, workers=2)"
+    )
+    process = subprocess.Popen([sys.executable, "-c", script], cwd=ROOT)
+    try:
+        deadline = time.monotonic() + 30
+        while len(stored_urls(store)) < 10 and time.monotonic() < deadline and process.poll() is None:
+            time.sleep(0.02)
+        process.send_signal(signal.SIGKILL)
+    finally:
+        process.wait()
+    committed = stored_urls(store)
+    assert 10 <= len(committed) < PAGES
+
+    before = len(page_server.requests)
+    monkeypatch.setattr(main, "CACHE_ENABLED", False)
+    counts = main.crawl([seed], store, delay=0, workers=2)
+
+    resumed = fetched(page_server.requests[before:])
+    assert counts == {"done": PAGES}
+    assert len(stored_urls(store)) == PAGES
+    assert len(resumed) == len(set(resumed))
+    assert not {main.canonical_url(seed.replace("/p0", path)) for path in resumed} & committed
+
+
+def test_slow_robots_txt_does_not_block_other_hosts(page_server):
+    other = type(page_server)()
+    try:
+        slow_robots = threading.Event()
+
+        def respond(headers):
+            slow_robots.wait(5)
+            return 404, {}, b""
+        slow = page_server.route("/robots.txt", respond).replace("/robots.txt", "/page")
+        fast = other.add("/page", "<p>x</p>")
+        robots = main.RobotsRules()
+        waiting = threading.Thread(target=robots.allowed, args=(slow,))
+        waiting.start()
+        time.sleep(0.1)
+        start = time.monotonic()
+        assert robots.allowed(fast)
+        assert time.monotonic() - start < 1
+        slow_robots.set()
+        waiting.join()
+        assert robots.allowed(slow)
+    finally:
+        other.close()
@@ -0,0 +1,39 @@
+import html
+import json
+import os
+import re
+from urllib.parse import unquote
+
+from docx import Document
+
+import main
+
+PAGE = "<html><head><title>Services</title></head><body><main><h1>Our Services</h1><p>We fix roofs.</p></main></body></html>"
+
+
+def test_diff_scripts_load_for_any_docx_name(tmp_path, page_server, monkeypatch):
+    # '#', '?' and '%' in a file name would cut or garble the script URL
+    monkeypatch.setattr(main, "CACHE_ENABLED", False)
+    names = ["doc 3#x.docx", "what?.docx", "100%.docx", "Ünïcode page.docx"]
+    for name in names:
+        doc = Document()
+        doc.add_heading("Our Services", 1)
+        doc.add_paragraph("We fix roofs.")
+        doc.save(tmp_path / name)
+    url = page_server.add("/services", PAGE)
+
+    _, _, dashboard_path = main.run_batch(
+        str(tmp_path), [(name, url) for name in names], main.BatchOptions(compare_workers=1, incremental=False)
+    )
+
+    with open(dashboard_path, encoding="utf-8") as f:
+        dashboard = f.read()
+    diffs = [html.unescape(value) for value in re.findall(r"data-diff='([^']*)'", dashboard)]
+    assert len(diffs) == len(names)
+    for diff in diffs:
+        assert not set(diff) & set("#?% ")
+        # The browser resolves data-diff against the dashboard; the script
+        # then reports itself under the same name
+        with open(os.path.join(tmp_path, unquote(diff)), encoding="utf-8") as f:
+            script = f.read()
+        assert script.startswith(f"showDiff({json.dumps(diff)},")
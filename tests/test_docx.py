@@ -0,0 +1,49 @@
+from docx import Document
+from docx.enum.text import WD_BREAK
+from docx.shared import Inches
+
+import main
+
+
+def python_docx_text(path):
+    # The extraction read_docx_text replaced, for plain paragraphs
+    paragraphs = []
+    for p in Document(path).paragraphs:
+        if p.text.strip():
+            if p.style.name.startswith("Heading"):
+                paragraphs.append(f"<h{p.style.name[-1]}>{p.text}</h{p.style.name[-1]}>")
+            else:
+                paragraphs.append(p.text)
+    return "\n\n".join(paragraphs)
+
+
+def test_tab_stops_are_not_text(tmp_path):
+    doc = Document()
+    heading = doc.add_heading("Our Services", 1)
+    heading.paragraph_format.tab_stops.add_tab_stop(Inches(2))
+    body = doc.add_paragraph("Body text")
+    body.paragraph_format.tab_stops.add_tab_stop(Inches(1))
+    path = tmp_path / "tabs.docx"
+    doc.save(path)
+
+    assert main.read_docx_text(path) == "<h1>Our Services</h1>\n\nBody text"
+
+
+def test_tabs_and_breaks_in_runs_match_python_docx(tmp_path):
+    doc = Document()
+    doc.add_heading("Title", 1)
+    paragraph = doc.add_paragraph("Name")
+    paragraph.paragraph_format.tab_stops.add_tab_stop(Inches(1))
+    run = paragraph.add_run()
+    run.add_tab()
+    run.add_text("Value")
+    run.add_break()
+    run.add_text("Next line")
+    run.add_break(WD_BREAK.PAGE)
+    doc.add_paragraph("After\ta tab")
+    doc.add_paragraph("")
+    doc.add_heading("Section", 2)
+    path = tmp_path / "runs.docx"
+    doc.save(path)
+
+    assert main.read_docx_text(path) == python_docx_text(path)
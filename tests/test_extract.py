@@ -0,0 +1,26 @@
+import pathlib
+
+import pytest
+
+import main
+
+FIXTURES = pathlib.Path(__file__).parent / "fixtures" / "extract"
+
+
+@pytest.mark.parametrize("page", sorted(FIXTURES.glob("*.html")), ids=lambda path: path.stem)
+def test_extract_page_content_matches_fixture(page):
+    # Each page has the expected text next to it; regenerate a .txt only
+    # when an extraction change is meant to alter the output
+    text, _, _ = main.extract_page_content(page.read_text(encoding="utf-8"))
+    assert text + "\n" == page.with_suffix(".txt").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("name, title, meta_description", [
+    ("uagb_faq", "Roof Repair in Springfield | Acme Roofing", "Fast, affordable roof repair from a local team."),
+    ("accordion", "Plumbing Services", "Drain cleaning and water heaters."),
+    ("role_tabs", "Pricing Plans", ""),
+    ("links_in_paragraphs", "About   Us", "Who we are."),
+])
+def test_extract_page_content_title_and_description(name, title, meta_description):
+    _, page_title, page_description = main.extract_page_content((FIXTURES / f"{name}.html").read_text(encoding="utf-8"))
+    assert (page_title, page_description) == (title, meta_description)
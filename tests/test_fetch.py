@@ -0,0 +1,108 @@
+import gzip
+import io
+import time
+import zlib
+
+import pytest
+
+import main
+
+
+def get(url):
+    return main.get_session().get(url, timeout=main.FETCH_TIMEOUT, stream=True)
+
+
+class FakeRaw:
+    # A response body that arrives in chunks, optionally slowly
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = iter(chunks)
+        self.delay = delay
+
+    def read1(self, size, decode_content=False):
+        time.sleep(self.delay)
+        return next(self.chunks, b"")
+
+
+class FakeResponse:
+    def __init__(self, chunks, headers=None, delay=0.0):
+        self.headers = {"Content-Type": "text/html", **(headers or {})}
+        self.raw = FakeRaw(chunks, delay)
+
+
+def test_reads_a_page(page_server):
+    url = page_server.add("/page", "<p>Hello</p>")
+    with get(url) as response:
+        assert main.read_html(response) == ("<p>Hello</p>", 12)
+
+
+def test_rejects_other_content_types_before_reading(page_server):
+    url = page_server.add("/file.pdf", b"%PDF-1.4" * 1000, headers={"Content-Type": "application/pdf"})
+    with get(url) as response, pytest.raises(ValueError, match="Not an HTML page"):
+        main.read_html(response)
+
+
+def test_rejects_a_declared_length_over_the_limit(page_server):
+    url = page_server.add("/big", "x" * 5000)
+    with get(url) as response, pytest.raises(ValueError, match="larger than 1000 bytes"):
+        main.read_html(response, max_bytes=1000)
+
+
+def test_stops_reading_at_the_limit_without_a_length():
+    chunks = (b"x" * 1000 for _ in range(1000))
+    with pytest.raises(ValueError, match="larger than 5000 bytes"):
+        main.read_html(FakeResponse(chunks), max_bytes=5000)
+
+
+def test_stops_a_trickling_body_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(main, "FETCH_DEADLINE", 0.1)
+    chunks = (b"<p>x</p>" for _ in range(1000))
+    start = time.monotonic()
+    with pytest.raises(ValueError, match="longer than"):
+        main.read_html(FakeResponse(chunks, delay=0.01))
+    assert time.monotonic() - start < 1
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+])
+def test_compressed_bomb_is_stopped_at_the_decoded_limit(page_server, encoding, compress):
+    # 50 MB of zeros compress to about 50 KB
+    body = compress(b"\0" * (50 * 1024 * 1024))
+    url = page_server.add("/bomb", body, headers={"Content-Type": "text/html", "Content-Encoding": encoding})
+    with get(url) as response, pytest.raises(ValueError, match="larger than 1048576 bytes"):
+        main.read_html(response, max_bytes=1024 * 1024)
+
+
+def test_compressed_page_is_decoded(page_server):
+    url = page_server.add("/gz", gzip.compress("<p>Grüße</p>".encode("utf-8")),
+                          headers={"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"})
+    with get(url) as response:
+        assert main.read_html(response)[0] == "<p>Grüße</p>"
+
+
+@pytest.mark.parametrize("content_type, body, expected", [
+    # Content-Type charset
+    ("text/html; charset=iso-8859-1", "<p>café</p>".encode("latin-1"), "<p>café</p>"),
+    # <meta charset> within the sniffed prefix
+    ("text/html", b"<meta charset='windows-1252'><p>\x93quoted\x94</p>", "<meta charset='windows-1252'><p>“quoted”</p>"),
+    ("text/html", b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r"><p>\xf0\xd2\xc9</p>',
+     '<meta http-equiv="Content-Type" content="text/html; charset=koi8-r"><p>При</p>'),
+    # Byte order marks win over everything else
+    ("text/html; charset=iso-8859-1", "﻿<p>ü</p>".encode("utf-8"), "<p>ü</p>"),
+    ("text/html", "<p>ü</p>".encode("utf-16"), "<p>ü</p>"),
+    # Undeclared: UTF-8 if it decodes, otherwise windows-1252 like browsers
+    ("text/html", "<p>naïve</p>".encode("utf-8"), "<p>naïve</p>"),
+    ("text/html", b"<p>na\xefve \x80</p>", "<p>naïve €</p>"),
+    # An unknown charset falls back to UTF-8
+    ("text/html; charset=x-unknown", "<p>é</p>".encode("utf-8"), "<p>é</p>"),
+])
+def test_charset_sniffing(page_server, content_type, body, expected):
+    url = page_server.add("/charset", body, headers={"Content-Type": content_type})
+    with get(url) as response:
+        assert main.read_html(response)[0] == expected
+
+
+def test_utf8_character_cut_by_the_sniff_prefix_stays_utf8():
+    body = b"x" * (main.CHARSET_SNIFF_BYTES - 1) + "é".encode("utf-8")
+    assert main.read_html(FakeResponse([body]))[0].endswith("é")
@@ -0,0 +1,157 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+import main
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    async def goto(self, url, **kwargs):
+        if self.context.hang:
+            await asyncio.sleep(3600)
+
+    async def content(self):
+        return f"<p>{self.context.name}</p>"
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    def __init__(self, name, broken=False, hang=False):
+        self.name = name
+        self.broken = broken
+        self.hang = hang
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def clear_cookies(self):
+        if self.broken:
+            raise RuntimeError("Target page, context or browser has been closed")
+
+    async def close(self):
+        self.closed = True
+
+    async def route(self, pattern, handler):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.opened = 0
+
+    async def new_context(self, **kwargs):
+        self.opened += 1
+        return FakeContext(f"new{self.opened}")
+
+
+def make_pool(*contexts):
+    # A RenderPool around fake contexts, without starting a browser
+    pool = main.RenderPool.__new__(main.RenderPool)
+    pool.timeout_error = asyncio.TimeoutError
+    pool.browser = FakeBrowser()
+    pool.loop = asyncio.new_event_loop()
+    threading.Thread(target=pool.loop.run_forever, daemon=True).start()
+
+    async def fill():
+        pool.contexts = asyncio.Queue()
+        for context in contexts:
+            pool.contexts.put_nowait(context)
+
+    pool._call(fill())
+    return pool
+
+
+def pooled(pool):
+    # Takes the context back out of the pool, waiting for a cancelled render
+    # to finish its cleanup
+    async def take():
+        return [await asyncio.wait_for(pool.contexts.get(), 5)]
+
+    return pool._call(take())
+
+
+def test_context_that_cannot_be_reset_is_replaced():
+    broken = FakeContext("broken", broken=True)
+    pool = make_pool(broken)
+    assert pool.render("http://example.com/") == "<p>broken</p>"
+    assert broken.closed
+    assert pool.render("http://example.com/") == "<p>new1</p>"
+    assert [context.name for context in pooled(pool)] == ["new1"]
+
+
+def test_render_times_out_and_returns_its_context():
+    pool = make_pool(FakeContext("slow", hang=True))
+    with pytest.raises(concurrent.futures.TimeoutError):
+        pool.render("http://example.com/", timeout=0.2)
+    assert [context.name for context in pooled(pool)] == ["slow"]
+
+
+URL = "http://example.com/faq/"
+SHELL = "<html><head><title>FAQ</title></head><body><main><div class='wp-block-uagb-faq'></div></main></body></html>"
+RENDERED = (
+    "<html><head><title>FAQ</title></head><body><main><h1>Questions</h1>"
+    f"<p>{'Answers built by a script once the page loads. ' * 10}</p></main></body></html>"
+)
+
+
+class FakeRenderPool:
+    def __init__(self):
+        self.urls = []
+
+    def render(self, url):
+        self.urls.append(url)
+        return RENDERED
+
+
+class NotModifiedSession:
+    # Answers every request with 304 Not Modified
+    class Response:
+        status_code = 304
+        headers = {}
+        url = URL
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+    def get(self, url, **kwargs):
+        return self.Response()
+
+
+@pytest.fixture
+def cached_shell(tmp_path, monkeypatch):
+    # A JS shell page cached by a run without --render, then --render turned on
+    cache = main.PageCache(str(tmp_path))
+    text, title, meta_description = main.extract_page_content(SHELL)
+    cache.put(URL, {
+        "fetched_at": time.time(), "etag": '"v1"', "last_modified": None,
+        "text": text, "title": title, "meta_description": meta_description, "links": [],
+    }, SHELL)
+    pool = FakeRenderPool()
+    monkeypatch.setattr(main, "get_page_cache", lambda: cache)
+    monkeypatch.setattr(main, "get_render_pool", lambda: pool)
+    monkeypatch.setattr(main, "get_session", lambda: NotModifiedSession())
+    monkeypatch.setattr(main, "RENDER_ENABLED", True)
+    return pool
+
+
+@pytest.mark.parametrize("ttl, outcome", [(3600, "hit"), (0, "revalidated")])
+def test_thin_cached_page_is_rendered_once(cached_shell, monkeypatch, ttl, outcome):
+    monkeypatch.setattr(main, "CACHE_TTL", ttl)
+    metrics = {}
+    text, _, _ = main.get_webpage_text(URL, metrics)
+    assert text.startswith("<h1>Questions</h1>")
+    assert (metrics["cache"], metrics["render"]) == (outcome, "rendered")
+    assert main.get_webpage_text(URL)[0] == text
+    assert cached_shell.urls == [URL]